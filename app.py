@@ -1,12 +1,31 @@
 # app.py
+import queue
+import time
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 
 from ui.crud_panel import CrudPanel
 from ui.events_panel import EventsPanel
+from ui.image_cache import ImageCache
+from thumb_store import ThumbStore, thumb_dir
 from ui.timeline_view import TimelineView, color_for_character, color_for_location
-from storage import new_empty_project, load_project, save_project
+from storage import save_project, iter_project
+from journal import ProjectJournal, is_journaled
+from sqlite_store import SqliteProject, is_sqlite
+
+LOAD_SLICE_MS = 30       # så länge en inläsningsomgång får hålla UI-tråden
+
+PROJECT_FILETYPES = [("JSON files", "*.json"), ("Journaled project", "*.tlj"),
+                     ("SQLite project", "*.tldb"), ("Compressed project", "*.tlz *.tlxz")]
+
+
+def open_store(path: Path):
+    """Inkrementell lagring för formaten som har en (.tlj, .tldb), annars None."""
+    if is_journaled(path): return ProjectJournal(path)
+    if is_sqlite(path):    return SqliteProject(path)
+    return None
 
 
 # ScrollableFrame (för Editor-fliken) 
@@ -75,6 +94,18 @@ class TimelineApp(tk.Tk):
 
         self.project_path: Path | None = None
         self._dirty = False
+        self._store: ProjectJournal | SqliteProject | None = None  # bara för .tlj/.tldb
+
+        # bakgrundssparning: en arbetstråd (sparningar skrivs i ordning),
+        # resultat tillbaka till UI-tråden via en kö som pollas med after()
+        self._save_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save")
+        self._save_results: queue.Queue = queue.Queue()
+        self._saves_in_flight = 0
+        self._edit_seq = 0   # räknas upp vid varje ändring
+        self._loading = None  # pågående inläsning: (sökväg, lagring, bitar, panelernas mål)
+
+        # bildcache som delas av Characters/Locations-panelerna och timelinen
+        self.images = ImageCache(self)
 
         # Meny
         menubar = tk.Menu(self)
@@ -91,6 +122,13 @@ class TimelineApp(tk.Tk):
         self.bind("<Control-s>", lambda e: self.save_project())
         self.bind("<Control-o>", lambda e: self.open_project())
 
+        # Statusrad (visar förlopp vid inläsning)
+        status = ttk.Frame(self, padding=(6, 2))
+        status.pack(side="bottom", fill="x")
+        self.status_var = tk.StringVar()
+        ttk.Label(status, textvariable=self.status_var).pack(side="left")
+        self.progress = ttk.Progressbar(status, length=180, maximum=100)
+
         # Notebook
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(fill="both", expand=True)
@@ -117,6 +155,8 @@ class TimelineApp(tk.Tk):
             "Characters (name, description)",
             on_change=self.mark_dirty,
             color_getter=color_for_character,   
+            on_record=self._recorder("characters"),
+            images=self.images,
         )
         self.characters_panel.pack(fill="both", expand=True, pady=(0, 8))
 
@@ -125,6 +165,8 @@ class TimelineApp(tk.Tk):
             "Locations (name, description)",
             on_change=self.mark_dirty,
             color_getter=color_for_location,    
+            on_record=self._recorder("locations"),
+            images=self.images,
         )
         self.locations_panel.pack(fill="both", expand=True)
 
@@ -145,6 +187,7 @@ class TimelineApp(tk.Tk):
             get_locations=lambda: _get_loc_names(),
             on_change=self.mark_dirty,
             on_filter=self._timeline_redraw_safe,
+            on_record=self._recorder("events"),
         )
         self.events_panel.pack(fill="both", expand=True)
 
@@ -154,6 +197,9 @@ class TimelineApp(tk.Tk):
             get_characters=lambda: self.characters_panel.data(),
             get_locations=lambda: self.locations_panel.data(),
             events_panel=self.events_panel,
+            characters=self.characters_panel.registry,
+            locations=self.locations_panel.registry,
+            images=self.images,
         )
         self.timeline_view.pack(fill="both", expand=True)
 
@@ -167,12 +213,39 @@ class TimelineApp(tk.Tk):
         except Exception:
             pass
 
+    def _recorder(self, section: str):
+        """Callback för panelerna: skicka add/update/delete vidare till journal/databas."""
+        def record(op, old, new):
+            if self._store is not None:
+                self._store.record(section, op, old, new)
+        return record
+
+    def _set_store(self, store):
+        old, self._store = self._store, store
+        if old is not None and old is not store and hasattr(old, "close"):
+            old.close()
+
+    def _set_thumbs(self, path: Path | None, data: dict | None = None):
+        """Miniatyrer på disk i <projekt>.thumbs (inget för ett osparat projekt).
+        data: projektets listor per sektion (standard: panelernas)."""
+        if path is None:
+            self.images.set_store(None)
+            return
+        if data is None:
+            data = {"characters": self.characters_panel.data(),
+                    "locations":  self.locations_panel.data(),
+                    "events":     self.events_panel.data()}
+        paths = {(it.get("image") or "").strip() for items in data.values() for it in items}
+        paths.discard("")
+        self.images.set_store(ThumbStore(thumb_dir(path)), paths)
+
     def _on_tab_changed(self, _e):
         if self.notebook.select() == self.notebook.tabs()[1]:
             self.timeline_view.redraw()
 
     def mark_dirty(self):
         self._dirty = True
+        self._edit_seq += 1
         # uppdatera referenser i event-form (namnlistor)
         try:
             self.events_panel.refresh_refs()
@@ -183,6 +256,7 @@ class TimelineApp(tk.Tk):
     #  Filhantering 
     def new_project(self):
         """Starta helt tomt projekt + rensa alla formulär & sökfält."""
+        self._cancel_load()
         # 1) Tom data
         self.characters_panel.set_data([])
         self.locations_panel.set_data([])
@@ -205,17 +279,22 @@ class TimelineApp(tk.Tk):
 
         # 3) Återställ filstatus och timeline
         self.project_path = None
+        self._set_store(None)
+        self.images.clear()
+        self._set_thumbs(None)
         self._dirty = False
         self._timeline_redraw_safe()
 
     def save_as(self):
         path = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json")],
+            filetypes=PROJECT_FILETYPES,
             title="Save project as"
         )
         if path:
             self.project_path = Path(path)
+            self._set_store(open_store(self.project_path))
+            self._set_thumbs(self.project_path)
             self._write_current()
 
     def save_project(self):
@@ -224,45 +303,144 @@ class TimelineApp(tk.Tk):
         self._write_current()
 
     def _write_current(self):
+        # Ögonblicksbild: bara listorna kopieras. Panelerna ersätter poster i
+        # stället för att ändra dem på plats, så dicts kan delas med arbetstråden.
         data = {
-            "characters": self.characters_panel.data(),
-            "locations":  self.locations_panel.data(),
-            "events":     self.events_panel.data(),  
+            "characters": list(self.characters_panel.data()),
+            "locations":  list(self.locations_panel.data()),
+            "events":     list(self.events_panel.data()),
         }
+        path, store, seq = self.project_path, self._store, self._edit_seq
         try:
-            save_project(self.project_path, data)
-            self._dirty = False
+            if store is not None:
+                job = store.prepare_save(data)  # bara ändringarna sedan förra sparningen
+            else:
+                job = lambda: save_project(path, data)
         except Exception as e:
             messagebox.showerror("Error", f"Could not save file:\n{e}")
+            return
+
+        def run():
+            try:
+                job()
+                self._save_results.put((store, seq, None))
+            except Exception as e:
+                self._save_results.put((store, seq, e))
+
+        self._save_pool.submit(run)
+        self._saves_in_flight += 1
+        self.status_var.set("Saving…")
+        if self._saves_in_flight == 1:
+            self.after(50, self._poll_saves)
+
+    def _poll_saves(self):
+        while True:
+            try:
+                store, seq, err = self._save_results.get_nowait()
+            except queue.Empty:
+                break
+            self._saves_in_flight -= 1
+            if store is not None:
+                store.save_done(err is None)
+            if err is not None:
+                messagebox.showerror("Error", f"Could not save file:\n{err}")
+            elif seq == self._edit_seq:
+                self._dirty = False   # inget ändrat sedan ögonblicksbilden
+        if self._saves_in_flight:
+            self.after(50, self._poll_saves)
+        else:
+            self.status_var.set("")
+
+    def _panels(self) -> dict:
+        return {
+            "characters": self.characters_panel,
+            "locations":  self.locations_panel,
+            "events":     self.events_panel,
+        }
 
     def open_project(self):
         path = filedialog.askopenfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json")],
+            filetypes=PROJECT_FILETYPES,
             title="Open project"
         )
         if not path:
             return
+        self._cancel_load()
+        path = Path(path)
+        try:
+            store = open_store(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not open file:\n{e}")
+            return
+        chunks = (store.iter_load(on_progress=self._show_progress) if store
+                  else iter_project(path, on_progress=self._show_progress))
+        # bitarna går direkt in i panelernas mål vid sidan av; öppet projekt,
+        # lagring och sökväg rörs inte förrän allt lästs, så ett fel lämnar dem orörda
+        targets = {section: p.begin_load() for section, p in self._panels().items()}
+        self._loading = (path, store, chunks, targets)
+        self.progress["value"] = 0
+        self.progress.pack(side="right")
+        self.status_var.set(f"Loading {path.name}…")
+        self.after_idle(self._load_step)
+
+    def _load_step(self):
+        """Läs bitar i högst LOAD_SLICE_MS och lämna sedan tillbaka UI-tråden."""
+        if self._loading is None:
+            return
+        path, store, chunks, targets = self._loading
+        deadline = time.perf_counter() + LOAD_SLICE_MS / 1000
         try:
-            data = load_project(Path(path))
+            for section, chunk in chunks:
+                targets[section].extend(chunk)
+                if time.perf_counter() >= deadline:
+                    self.after(1, self._load_step)
+                    return
+        except Exception as e:
+            self._cancel_load()
+            messagebox.showerror("Error", f"Could not open file:\n{e}")
+            return
+        self._loading = None
+        self._end_load_status()
 
-            try:
-                self.characters_panel.clear_form()
-                self.locations_panel.clear_form()
-                self.events_panel.set_search("")
-                self.events_panel.clear_form()
-            except Exception:
-                pass
+        try:
+            self.characters_panel.clear_form()
+            self.locations_panel.clear_form()
+            self.events_panel.set_search("")
+            self.events_panel.clear_form()
+        except Exception:
+            pass
 
-            self.characters_panel.set_data(list(data.get("characters", [])))
-            self.locations_panel.set_data(list(data.get("locations", [])))
-            self.events_panel.set_data(list(data.get("events", [])))  
+        self.images.clear()             # nytt projekt: stat:a och avkoda bilderna på nytt
+        # disk-cachen före panelerna: end_load laddar redan previews
+        self._set_thumbs(path, {"characters": targets["characters"],
+                                "locations":  targets["locations"],
+                                "events":     targets["events"].events})
+        for section, p in self._panels().items():
+            p.end_load(targets[section])
 
-            self.project_path = Path(path)
-            self._dirty = False
-            self._timeline_redraw_safe()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not open file:\n{e}")
+        self.project_path = path
+        self._set_store(store)
+        self._dirty = False
+        self._timeline_redraw_safe()
+
+    def _cancel_load(self):
+        """Avbryt en pågående inläsning; det öppna projektet är orört."""
+        if self._loading is None:
+            return
+        _, store, chunks, _ = self._loading
+        self._loading = None
+        chunks.close()
+        if store is not None and hasattr(store, "close"):
+            store.close()
+        self._end_load_status()
+
+    def _end_load_status(self):
+        self.progress.pack_forget()
+        self.status_var.set("")
+
+    def _show_progress(self, done: int, total: int):
+        self.progress["value"] = 100 * done / total
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+# benchmarks/bench_axis.py
+"""
+Layoutkostnad datum -> x (och x -> datum) för 1k/10k/100k unika datum:
+den gamla linjära .index()/min()-sökningen mot timeline_axis.Axis.
+
+    python benchmarks/bench_axis.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from timeline_axis import Axis  # noqa: E402
+
+EVENTS_PER_DATE = 2
+SAMPLE = 2000           # den gamla varianten mäts på ett urval och räknas upp
+
+
+def old_date_to_x(ords: list[int], start: float, step: float, d: int) -> float:
+    # som TimelineView._date_to_x före Axis
+    if d not in ords:
+        idx = min(range(len(ords)), key=lambda i: abs(ords[i] - d))
+    else:
+        idx = ords.index(d)
+    return start + idx * step
+
+
+def main():
+    rnd = random.Random(1)
+    print(f"{'dates':>8}{'events':>9}{'old s':>10}{'axis s':>10}{'x->date ms':>12}")
+    for n in (1_000, 10_000, 100_000):
+        ords = sorted(rnd.sample(range(700_000, 740_000 if n < 40_000 else 900_000), n))
+        events = [o for o in ords for _ in range(EVENTS_PER_DATE)]
+        rnd.shuffle(events)
+        start, usable = 80.0, 1200.0
+
+        sample = events[:SAMPLE]
+        t0 = time.perf_counter()
+        for o in sample:
+            old_date_to_x(ords, start, usable / (n - 1), o)
+        old = (time.perf_counter() - t0) * len(events) / len(sample)
+
+        t0 = time.perf_counter()
+        axis = Axis(ords)
+        axis.layout(start, usable, 0.0, False)
+        xs = [axis.date_to_x(o) for o in events]
+        new = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for x in xs[:1000]:
+            axis.x_to_ordinal(x)
+        back = (time.perf_counter() - t0) * 1e3
+        print(f"{n:>8}{len(events):>9}{old:>10.2f}{new:>10.3f}{back:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_filter.py
+"""
+Filterlatens per tangenttryckning: det gamla sättet (sortera om alla events
+och söka igenom söksträngarna) mot EventStore (alltid sorterad + sökindex),
+samt fältfrågor (char:/loc:/date:) som besvaras ur indexen.
+
+    python benchmarks/bench_filter.py [antal_events]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_formats import synthetic_project  # noqa: E402
+from dates import event_ordinals  # noqa: E402
+from event_store import EventStore  # noqa: E402
+from search_index import event_haystack  # noqa: E402
+
+STRUCTURED = ['char:"character 7"', 'char:"character 7" loc:"location 3"', "date:2025-01..2025-06",
+              'char:"character 7" date:2025-01..2025-06 "möte"', 'loc:"location 3" date:2010']
+QUERIES = ["", "h", "hä", "händelse 1", "händelse 12", "möte", "character 7", "location 3"]
+
+
+def old_filter(events: list[dict], q: str):
+    # som _apply_filter före EventStore: sortera, sedan genomsök allt
+    ords = event_ordinals(events)
+    order = sorted(range(len(events)), key=ords.__getitem__)
+    events[:] = [events[i] for i in order]
+    return [ev for ev in events if not q or q in event_haystack(ev)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    events = synthetic_project(n)["events"]
+    store = EventStore()
+    store.extend(events)
+    store.finish_load()
+    old = list(events)
+    print(f"{n} events")
+    print(f"{'query':<14}{'hits':>8}{'old ms':>10}{'store ms':>10}")
+    for q in QUERIES:
+        t0 = time.perf_counter()
+        want = old_filter(old, q)
+        t1 = time.perf_counter()
+        got = store.filter(q)[0]
+        t2 = time.perf_counter()
+        assert len(got) == len(want)
+        print(f"{q!r:<14}{len(got):>8}{(t1 - t0) * 1e3:>10.1f}{(t2 - t1) * 1e3:>10.1f}")
+    print()
+    print(f"{'query':<50}{'hits':>8}{'store ms':>10}")
+    for q in STRUCTURED:
+        t0 = time.perf_counter()
+        got = store.filter(q.lower())[0]
+        print(f"{q:<50}{len(got):>8}{(time.perf_counter() - t0) * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
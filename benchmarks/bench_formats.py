@@ -0,0 +1,69 @@
+# benchmarks/bench_formats.py
+"""
+Jämför filstorlek, sparning och inläsning för projektformaten.
+
+    python benchmarks/bench_formats.py [antal_events]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import SECTIONS, iter_project, save_project  # noqa: E402
+
+
+def synthetic_project(n_events: int, n_chars: int = 40, n_locs: int = 25, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    chars = [{"name": f"Character {i}", "description": f"Beskrivning av karaktär {i}",
+              "image": f"C:/Users/demo/Pictures/characters/char_{i:03d}.jpg"} for i in range(n_chars)]
+    locs = [{"name": f"Location {i}", "description": f"Gatan {i}",
+             "image": f"C:/Users/demo/Pictures/places/loc_{i:03d}.webp"} for i in range(n_locs)]
+    events = []
+    for i in range(n_events):
+        who = rnd.sample(chars, rnd.randint(1, 3))
+        events.append({
+            "Event": f"Händelse {i}",
+            "date": f"{rnd.randint(1, 28)}/{rnd.randint(1, 12)}/{rnd.randint(2000, 2030)}",
+            "characters": [c["name"] for c in who],
+            "activity": rnd.choice(["möte", "lektion", "träning", "resa", ""]),
+            "location": rnd.choice(locs)["name"],
+            "image": who[0]["image"] if rnd.random() < 0.3 else "",
+        })
+        if i % 7 == 0:
+            events[-1]["note"] = None if i % 2 else "anteckning"   # null ska överleva, saknad nyckel likaså
+    return {"characters": chars, "locations": locs, "events": events}
+
+
+def read_all(path: Path) -> dict:
+    data = {s: [] for s in SECTIONS}
+    for section, chunk in iter_project(path):
+        data[section].extend(chunk)
+    return data
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    data = synthetic_project(n)
+    print(f"{n} events")
+    print(f"{'format':<8}{'size':>12}{'save s':>10}{'load s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in (".json", ".tlz", ".tlxz"):
+            path = Path(tmp) / f"project{suffix}"
+            t0 = time.perf_counter()
+            save_project(path, data)
+            t1 = time.perf_counter()
+            count = sum(len(chunk) for _section, chunk in iter_project(path))
+            t2 = time.perf_counter()
+            assert count == n + len(data["characters"]) + len(data["locations"])
+            if suffix == ".json":
+                reference = read_all(path)
+            else:
+                assert read_all(path) == reference, f"{suffix}: round trip differs from JSON"
+            print(f"{suffix:<8}{path.stat().st_size / 1e6:>10.2f}MB{t1 - t0:>10.2f}{t2 - t1:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
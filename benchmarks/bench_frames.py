@@ -0,0 +1,70 @@
+# benchmarks/bench_frames.py
+"""
+Hur många omritningar FrameScheduler slår ihop när pan/zoom-händelser
+kommer tätare än en frame hinner ritas. En enkel händelseloop med riktig
+klocka står för after/after_idle, render() tar RENDER_MS.
+
+    python benchmarks/bench_frames.py [antal_händelser]
+"""
+import heapq
+import itertools
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ui.frame_scheduler import FrameScheduler  # noqa: E402
+
+EVENT_MS = 2            # musrörelse var 2 ms (typiskt vid drag)
+RENDER_MS = 6
+
+
+class Loop:
+    """Minsta möjliga ersättning för Tk:s after/after_idle/after_cancel."""
+    def __init__(self):
+        self._jobs: list = []
+        self._ids = itertools.count()
+        self._cancelled: set[int] = set()
+
+    def after(self, ms: int, fn):
+        jid = next(self._ids)
+        heapq.heappush(self._jobs, (time.perf_counter() + ms / 1000, jid, fn))
+        return jid
+
+    def after_idle(self, fn):
+        return self.after(0, fn)
+
+    def after_cancel(self, jid: int):
+        self._cancelled.add(jid)
+
+    def run_until(self, t: float):
+        while self._jobs and self._jobs[0][0] <= t:
+            _, jid, fn = heapq.heappop(self._jobs)
+            if jid not in self._cancelled:
+                fn()
+
+    def drain(self):
+        while self._jobs:
+            time.sleep(max(0.0, self._jobs[0][0] - time.perf_counter()))
+            self.run_until(time.perf_counter())
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"{n} händelser var {EVENT_MS} ms, render {RENDER_MS} ms")
+    for budget in (0, 16):
+        loop = Loop()
+        frames = FrameScheduler(loop, lambda: time.sleep(RENDER_MS / 1000), budget_ms=budget)
+        t0 = time.perf_counter()
+        for i in range(n):
+            due = t0 + i * EVENT_MS / 1000
+            loop.run_until(due)
+            time.sleep(max(0.0, due - time.perf_counter()))
+            frames.request()
+        loop.drain()
+        print(f"budget {budget:>2} ms: {frames.stats()}")
+
+
+if __name__ == "__main__":
+    main()
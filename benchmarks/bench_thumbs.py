@@ -0,0 +1,79 @@
+# benchmarks/bench_thumbs.py
+"""
+Kall mot varm projektöppning för miniatyrerna: kall = avkoda kamerabilderna
+och spara miniatyrerna i <projekt>.thumbs, varm = läsa dem därifrån
+(thumb_store.ThumbStore). Kräver Pillow.
+
+    python benchmarks/bench_thumbs.py [antal_bilder]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from thumb_store import PIL_OK, ThumbStore, thumb_dir  # noqa: E402
+from ui.crud_panel import CrudPanel  # noqa: E402
+from ui.image_cache import decode, file_sig  # noqa: E402
+
+# storlekarna som timelinen (legend, event, dialog, hover) och CrudPanels preview använder
+BOXES = ((22, 22), (40, 40), (80, 80), (100, 100), CrudPanel.PREVIEW_SIZE)
+PHOTO = (3000, 2000)
+
+
+def make_photos(folder: Path, n: int) -> list[str]:
+    from PIL import Image
+    rnd = random.Random(1)
+    paths = []
+    for i in range(n):
+        # brus komprimerar dåligt, som ett riktigt foto
+        im = Image.effect_noise(PHOTO, 40).convert("RGB")
+        im = Image.merge("RGB", [b.point(lambda v, o=rnd.randint(0, 80): v + o) for b in im.split()])
+        p = folder / f"photo_{i:03d}.jpg"
+        im.save(p, "JPEG", quality=90)
+        paths.append(str(p))
+    return paths
+
+
+def open_project(store: ThumbStore, paths: list[str]) -> float:
+    t0 = time.perf_counter()
+    for p in paths:
+        sig = file_sig(p)
+        for box in BOXES:
+            if store.load(p, sig, box) is None:
+                store.save(p, sig, box, decode(p, box))
+    return time.perf_counter() - t0
+
+
+def main():
+    if not PIL_OK:
+        print("Pillow saknas: pip install pillow")
+        return
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        print(f"skapar {n} foton {PHOTO[0]}x{PHOTO[1]}…")
+        paths = make_photos(folder, n)
+        store = ThumbStore(thumb_dir(folder / "demo.json"))
+        assert all(store.wants(box) for box in BOXES)   # alla storlekar hamnar i disk-cachen
+
+        cold = open_project(store, paths)
+        warm = open_project(store, paths)
+        size = sum(f.stat().st_size for f in store.root.iterdir())
+
+        print(f"{'':>6}{'total s':>10}{'ms/bild':>10}")
+        print(f"{'kall':>6}{cold:>10.2f}{cold / n * 1000:>10.1f}")
+        print(f"{'varm':>6}{warm:>10.2f}{warm / n * 1000:>10.1f}")
+        print(f"{len(BOXES) * n} miniatyrer, {size / 1024:.0f} kB på disk, "
+              f"{cold / warm:.0f}x snabbare varm")
+
+        # prune: hälften av bilderna används inte längre
+        t0 = time.perf_counter()
+        removed = store.prune((p, file_sig(p)) for p in paths[: n // 2])
+        print(f"prune: {removed} föräldralösa borttagna på {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# compact_store.py
+"""
+Kompakt, komprimerat projektformat.
+
+.tlz   gzip
+.tlxz  lzma (mindre fil, långsammare att skriva)
+
+Innehållet är JSON men kolumnvis per sektion i stället för en dict per
+post, och namn (karaktärer, platser) samt bildsökvägar lagras en gång i
+en strängtabell och refereras med index:
+
+    {"format": "timeline-compact", "version": 2,
+     "strings": ["Maram", "bth", "C:/.../0.jpg", ...],
+     "characters": {"name": [0, ...], "description": [...], "image": [2, ...]},
+     "locations":  {...},
+     "events":     {"Event": [...], "date": [...], "characters": [[0, 3], ...],
+                    "location": [1, ...], "activity": [...], "image": [...]}}
+
+Alla kolumner i en sektion är lika långa. En nyckel som saknas i en post
+lagras som null i sin kolumn och radnumret listas i "absent", så att ett
+värde som verkligen är null överlever:
+
+     "absent": {"events": {"image": [4, 17]}}
+
+(Version 1 saknade "absent": där betyder null att nyckeln saknas.)
+"""
+import gzip
+import json
+import lzma
+from pathlib import Path
+
+from storage import NORMALIZERS, SECTIONS, write_bytes_atomic
+
+FORMAT = "timeline-compact"
+VERSION = 2
+CODECS = {".tlz": gzip, ".tlxz": lzma}
+
+# kolumner vars värden internas i strängtabellen (listor internas per element)
+_INTERNED = {
+    "characters": {"name", "image"},
+    "locations":  {"name", "image"},
+    "events":     {"characters", "location", "image"},
+}
+_ABSENT = object()        # platshållare vid avkodning för en nyckel som saknas i posten
+
+
+class _Strings:
+    def __init__(self):
+        self.table: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def __call__(self, s) -> int:
+        s = "" if s is None else str(s)
+        i = self._index.get(s)
+        if i is None:
+            i = self._index[s] = len(self.table)
+            self.table.append(s)
+        return i
+
+
+def encode(data: dict) -> bytes:
+    """Projekt-dict -> kolumnvis JSON (okomprimerad, utf-8)."""
+    strings = _Strings()
+    out: dict = {"format": FORMAT, "version": VERSION}
+    for section in SECTIONS:
+        recs = data.get(section, []) or []
+        keys: dict[str, None] = {}
+        for rec in recs:
+            keys.update(dict.fromkeys(rec))
+        interned = _INTERNED[section]
+        cols, absent = {}, {}
+        for key in keys:
+            col, missing = [], []
+            for i, rec in enumerate(recs):
+                if key not in rec:
+                    col.append(None)
+                    missing.append(i)
+                    continue
+                v = rec[key]
+                if key in interned and v is not None:
+                    col.append([strings(x) for x in v] if isinstance(v, list) else strings(v))
+                else:
+                    col.append(v)
+            cols[key] = col
+            if missing:
+                absent[key] = missing
+        out[section] = cols
+        if absent:
+            out.setdefault("absent", {})[section] = absent
+    out["strings"] = strings.table
+    return json.dumps(out, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def iter_decode(raw: bytes, chunk_size: int = 2000):
+    """Kolumnvis JSON -> (sektion, [normaliserade poster]) i bitar."""
+    doc = json.loads(raw)
+    if doc.get("format") != FORMAT:
+        raise ValueError("Not a compact timeline project")
+    if doc.get("version", 0) > VERSION:
+        raise ValueError(f"Compact project version {doc.get('version')} is newer than supported")
+    table = doc.get("strings", [])
+    v1 = doc.get("version", 0) < 2
+    for section in SECTIONS:
+        cols = doc.pop(section, None) or {}
+        absent = (doc.get("absent") or {}).get(section) or {}
+        interned = _INTERNED[section]
+        norm = NORMALIZERS[section]
+        # avinterna kolumnvis, sedan byggs posterna rad för rad
+        keys = list(cols)
+        decoded = []
+        for key in keys:
+            col = cols[key]
+            if key in interned:
+                col = [None if v is None else
+                       [table[i] for i in v] if isinstance(v, list) else table[v]
+                       for v in col]
+            missing = [i for i, v in enumerate(col) if v is None] if v1 else absent.get(key, ())
+            if missing:
+                col = list(col)
+                for i in missing:
+                    col[i] = _ABSENT
+            decoded.append(col)
+        chunk: list[dict] = []
+        for row in zip(*decoded):
+            chunk.append(norm({k: v for k, v in zip(keys, row) if v is not _ABSENT}))
+            if len(chunk) >= chunk_size:
+                yield section, chunk
+                chunk = []
+        if chunk:
+            yield section, chunk
+
+
+#  storage-gränssnittet (load_project/save_project/iter_project)
+def iter_project(path: Path, chunk_size: int = 2000, on_progress=None):
+    codec = CODECS[path.suffix.lower()]
+    raw = codec.decompress(path.read_bytes())
+    if on_progress: on_progress(0, 1)
+    yield from iter_decode(raw, chunk_size)
+    if on_progress: on_progress(1, 1)
+
+def load_project(path: Path) -> dict:
+    data = {s: [] for s in SECTIONS}
+    for section, chunk in iter_project(path):
+        data[section].extend(chunk)
+    return data
+
+def save_project(path: Path, data: dict) -> None:
+    codec = CODECS[path.suffix.lower()]
+    level = {"preset": 6} if codec is lzma else {"compresslevel": 6}
+    write_bytes_atomic(path, codec.compress(encode(data), **level))
@@ -0,0 +1,111 @@
+# dates.py
+"""
+Gemensam datumtolkning för paneler, timeline och lagring.
+
+Godtar t.ex. 2025-10-28, 28/10/2025, 28/10 (innevarande år), 28 okt 2025
+och "oktober 2025". Resultatet cachas per (rå sträng, innevarande år), så
+datum utan år följer med över nyår. För sortering och layout används ett
+heltal (date.toordinal) som räknas ut en gång per event.
+"""
+import re
+from calendar import monthrange
+from datetime import date
+from functools import lru_cache
+
+_MONTHS = {
+    "jan": 1, "januari": 1, "feb": 2, "februari": 2,
+    "mar": 3, "mars": 3, "march": 3, "apr": 4, "april": 4,
+    "maj": 5, "may": 5, "jun": 6, "juni": 6, "june": 6,
+    "jul": 7, "juli": 7, "july": 7, "aug": 8, "augusti": 8, "august": 8,
+    "sep": 9, "sept": 9, "september": 9, "okt": 10, "oktober": 10, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+_YMD = re.compile(r"^\s*(\d{4})[\/\-\.\s](\d{1,2})[\/\-\.\s](\d{1,2})\s*$")
+_DMY = re.compile(r"^\s*(\d{1,2})[\/\-\.\s](\d{1,2})(?:[\/\-\.\s](\d{2,4}))?\s*$")
+_D_MON_Y = re.compile(r"^\s*(\d{1,2})\s+([a-zåäö\.]+)\s*(\d{2,4})?\s*$")
+_MON_Y = re.compile(r"^\s*([a-zåäö\.]+)\s*(\d{2,4})?\s*$")
+_Y = re.compile(r"^\s*(\d{4})\s*$")
+_YM = re.compile(r"^\s*(\d{4})[\/\-\.](\d{1,2})\s*$")
+
+# ordinal för tomt/okänt datum: sorteras sist och är aldrig ett giltigt datum
+UNKNOWN = date.max.toordinal() + 1
+
+
+def _year(y: str | None, this_year: int | None = None) -> int:
+    if y is None: return this_year or date.today().year
+    y = int(y)
+    return y + (2000 if y < 50 else (1900 if y < 100 else 0))
+
+def _make(y: int, mo: int, d: int) -> date | None:
+    mo = max(1, min(mo, 12))
+    try:
+        return date(y, mo, max(1, min(d, monthrange(y, mo)[1])))
+    except ValueError:   # år 0 eller > 9999
+        return None
+
+
+def parse_date(s: str) -> date | None:
+    """Tolka en datumsträng; None om den inte går att tolka."""
+    if not s: return None
+    return _parse_date(s, date.today().year)
+
+@lru_cache(maxsize=8192)
+def _parse_date(s: str, this_year: int) -> date | None:
+    t = s.strip().lower()
+    m = _YMD.match(t)
+    if m:
+        y, mo, d = map(int, m.groups())
+        return _make(y, mo, d)
+    m = _DMY.match(t)
+    if m:
+        d, mo, y = m.groups()
+        return _make(_year(y, this_year), int(mo), int(d))
+    m = _D_MON_Y.match(t)
+    if m:
+        d, mon_txt, y = m.groups()
+        mon = _MONTHS.get(mon_txt.rstrip("."))
+        if mon: return _make(_year(y, this_year), mon, int(d))
+    m = _MON_Y.match(t)
+    if m:
+        mon_txt, y = m.groups()
+        mon = _MONTHS.get(mon_txt.rstrip("."))
+        if mon: return _make(_year(y, this_year), mon, 1)
+    return None
+
+def date_ordinal(s: str) -> int:
+    """Sorteringsnyckel: date.toordinal(), eller UNKNOWN."""
+    d = parse_date(s)
+    return d.toordinal() if d else UNKNOWN
+
+def event_ordinals(events) -> list[int]:
+    """Batch: en ordinal per event (i samma ordning), varje datum tolkas en gång."""
+    return [date_ordinal(ev.get("date", "")) for ev in events]
+
+def parse_period(s: str) -> tuple[int, int] | None:
+    """Första och sista dagens ordinal för "2025", "2025-06", "juni 2025" eller ett datum."""
+    t = (s or "").strip().lower()
+    y = mo = None
+    m = _Y.match(t)
+    if m:
+        y = int(m.group(1))
+        lo, hi = _make(y, 1, 1), _make(y, 12, 31)
+    else:
+        m = _YM.match(t)
+        if m:
+            y, mo = map(int, m.groups())
+        else:
+            m = _MON_Y.match(t)
+            if m:
+                mo = _MONTHS.get(m.group(1).rstrip("."))
+                if not mo: return None
+                y = _year(m.group(2))
+        if mo is not None:
+            lo, hi = _make(y, mo, 1), _make(y, mo, 31)   # _make klämmer till månadens sista dag
+        else:
+            lo = hi = parse_date(s)
+    if lo is None or hi is None: return None
+    return lo.toordinal(), hi.toordinal()
+
+def format_date_dmy(d: date) -> str:
+    return f"{d.day}/{d.month}/{d.year}"
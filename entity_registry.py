@@ -0,0 +1,89 @@
+# entity_registry.py
+"""
+Namnindex för Characters/Locations: namn -> post (bild, beskrivning, färg).
+
+CrudPanel håller registret i takt vid add/update/delete, så timelinen slår
+upp en karaktär eller plats i O(1) i stället för att söka igenom listan.
+Som vid en linjär sökning vinner den första posten med ett visst namn.
+version räknas upp vid varje ändring (t.ex. för legendens cache).
+"""
+
+
+class EntityRegistry:
+    def __init__(self, get_items, color_getter=None):
+        self._get_items = get_items        # func() -> panelens lista (för dubblettnamn)
+        self.color_getter = color_getter   # optional: func(name) -> "#rrggbb"
+        self._by_name: dict[str, dict] = {}
+        self._count: dict[str, int] = {}   # antal poster per namn
+        self.version = 0
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name: str):
+        return name in self._by_name
+
+    #  underhåll (CrudPanel)
+    def rebuild(self):
+        self._by_name.clear(); self._count.clear()
+        for it in self._get_items():
+            self._link(it)                          # i listordning: första vinner
+        self.version += 1
+
+    def add(self, it: dict):
+        self._link(it)
+        self.version += 1
+
+    def remove(self, it: dict):
+        self._unlink(it)
+        self.version += 1
+
+    def replace(self, old: dict, new: dict):
+        """Anropas efter att panelen bytt old mot new på samma plats i listan."""
+        if old.get("name", "") == new.get("name", ""):
+            if self._by_name.get(old.get("name", "")) is old:
+                self._by_name[new.get("name", "")] = new    # samma namn och plats: byt bara posten
+        else:
+            self._unlink(old)
+            self._link(new, anywhere=True)
+        self.version += 1
+
+    def _link(self, it: dict, anywhere: bool = False):
+        # anywhere=False: posten ligger sist i listan, så en tidigare med samma namn vinner
+        name = it.get("name", "")
+        n = self._count.get(name, 0)
+        self._count[name] = n + 1
+        if n == 0:
+            self._by_name[name] = it
+        elif anywhere:
+            self._first(name)
+
+    def _unlink(self, it: dict):
+        name = it.get("name", "")
+        n = self._count.get(name, 0) - 1
+        if n <= 0:
+            self._count.pop(name, None); self._by_name.pop(name, None)
+            return
+        self._count[name] = n
+        if self._by_name.get(name) is it:
+            self._first(name)
+
+    def _first(self, name: str):
+        # bara när ett namn förekommer flera gånger
+        self._by_name[name] = next(it for it in self._get_items() if it.get("name", "") == name)
+
+    #  uppslag
+    def get(self, name: str) -> dict | None:
+        return self._by_name.get(name)
+
+    def image(self, name: str) -> str | None:
+        it = self._by_name.get(name)
+        p = ((it or {}).get("image", "") or "").strip()
+        return p if p else None
+
+    def description(self, name: str) -> str:
+        it = self._by_name.get(name)
+        return it.get("description", "") if it else ""
+
+    def color(self, name: str) -> str | None:
+        return self.color_getter(name) if self.color_getter else None
@@ -0,0 +1,210 @@
+# event_store.py
+"""
+Eventsamlingen bakom EventsPanel, alltid sorterad på datum.
+
+events och ords är parallella listor där ords (dates.date_ordinal) är
+icke-avtagande. Nya och ändrade events placeras med bisect_right, så lika
+datum ligger i den ordning de placerades. Bara inläsning sorterar (en gång,
+i finish_load); filtrering är en ren genomgång eller indexuppslagning.
+
+Vid sidan av sökindexet hålls index per karaktär och plats (gemena namn ->
+id(ev)) och id(ev) -> ordinal. select() besvarar en query.Query ur dem:
+mängderna snittas minst först, datumvillkor blir ett bisect-intervall, och
+små träffmängder placeras i datumordning utan att hela listan gås igenom.
+
+FilteredView är resultatet som panelen lämnar ut: skrivskyddat, utan kopior,
+med ett versionsnummer så att mottagare kan hoppa över omräkningar.
+"""
+from bisect import bisect_left, bisect_right
+
+from dates import date_ordinal, event_ordinals
+from query import Query, parse_query
+from search_index import SearchIndex
+
+
+class EventStore:
+    def __init__(self):
+        self.events: list[dict] = []
+        self.ords: list[int] = []
+        self.search = SearchIndex()
+        self._ord_of: dict[int, int] = {}             # id(ev) -> ordinal
+        self._by_char: dict[str, set[int]] = {}       # gement namn -> id(ev)
+        self._by_loc: dict[str, set[int]] = {}
+        self._all = None      # cachat svar på en tom fråga (kopior); nollas vid varje ändring
+
+    def __len__(self):
+        return len(self.events)
+
+    #  inläsning
+    def clear(self):
+        self.events = []
+        self.ords = []
+        self.search.clear()
+        self._ord_of.clear(); self._by_char.clear(); self._by_loc.clear()
+        self._all = None
+
+    def extend(self, chunk: list[dict]):
+        """Lägg till osorterat (under inläsning); avsluta med finish_load()."""
+        ords = event_ordinals(chunk)
+        self._all = None
+        self.events.extend(chunk)
+        self.ords.extend(ords)
+        self.search.extend(chunk)
+        for ev, o in zip(chunk, ords):
+            self._index(ev, o)
+
+    def finish_load(self):
+        # stabil sortering på ordinalerna, en gång per inläsning
+        self._all = None
+        order = sorted(range(len(self.events)), key=self.ords.__getitem__)
+        self.events = [self.events[i] for i in order]
+        self.ords = [self.ords[i] for i in order]
+
+    #  ändringar (håller sorteringen)
+    def insert(self, ev: dict) -> int:
+        o = date_ordinal(ev.get("date", ""))
+        i = bisect_right(self.ords, o)
+        self._all = None
+        self.events.insert(i, ev)
+        self.ords.insert(i, o)
+        self.search.add(ev)
+        self._index(ev, o)
+        return i
+
+    def pop(self, i: int) -> dict:
+        ev = self.events.pop(i)
+        del self.ords[i]
+        self._all = None
+        self.search.remove(ev)
+        self._unindex(ev)
+        return ev
+
+    def replace(self, i: int, ev: dict) -> tuple[dict, int]:
+        """Byt event på plats i mot ev; ger (gamla eventet, ny position)."""
+        old = self.pop(i)
+        return old, self.insert(ev)
+
+    #  fältindex
+    def _index(self, ev: dict, o: int):
+        k = id(ev)
+        self._ord_of[k] = o
+        for name in set(ev.get("characters") or []):
+            self._by_char.setdefault(name.lower(), set()).add(k)
+        self._by_loc.setdefault((ev.get("location") or "").lower(), set()).add(k)
+
+    def _unindex(self, ev: dict):
+        k = id(ev)
+        self._ord_of.pop(k, None)
+        for name in set(ev.get("characters") or []):
+            _discard(self._by_char, name.lower(), k)
+        _discard(self._by_loc, (ev.get("location") or "").lower(), k)
+
+    #  frågor
+    def filter(self, q: str) -> tuple[list[dict], list[int], list[int]]:
+        """(events, ordinaler, index i events) för filtertexten q (gemener), i datumordning."""
+        return self.select(parse_query(q))
+
+    def select(self, q: Query) -> tuple[list[dict], list[int], list[int]]:
+        if q.invalid:
+            return [], [], []
+        # datumvillkor -> ett positionsintervall [lo, hi) i den sorterade listan
+        lo, hi = 0, len(self.events)
+        for a, b in q.dates:
+            lo = max(lo, bisect_left(self.ords, a))
+            hi = min(hi, bisect_right(self.ords, b))
+        if lo >= hi:
+            return [], [], []
+
+        sets = [_names_matching(self._by_char, v) for v in q.chars]
+        sets += [_names_matching(self._by_loc, v) for v in q.locs]
+        sets += [self.search.search(t) for t in q.texts]
+        sets.sort(key=len)
+        if not sets:
+            if lo == 0 and hi == len(self.events):
+                # hela listan (tom sökruta): kopieras en gång per ändring, inte per tangenttryck
+                if self._all is None:
+                    self._all = (self.events[:], self.ords[:], list(range(hi)))
+                return self._all
+            return self.events[lo:hi], self.ords[lo:hi], list(range(lo, hi))
+        if len(sets[0]) < hi - lo:
+            # minsta mängden är mindre än datumintervallet: snitta och placera träffarna
+            keys = sets[0]
+            for s in sets[1:]:
+                if not keys: break
+                keys = keys & s
+            a, b = (self.ords[lo], self.ords[hi - 1]) if q.dates else (None, None)
+            if a is not None:
+                keys = {k for k in keys if a <= self._ord_of[k] <= b}
+            idx = self._positions(keys)
+        else:
+            events = self.events
+            idx = [i for i in range(lo, hi) if all(id(events[i]) in s for s in sets)]
+        return [self.events[i] for i in idx], [self.ords[i] for i in idx], list(idx)
+
+    def keys_with_any_character(self, names) -> set[int]:
+        """id(ev) för events med minst en av karaktärerna names."""
+        out: set[int] = set()
+        for name in names:
+            out |= self._by_char.get(name.lower(), set())
+        return out
+
+    def with_character(self, name: str) -> list[dict]:
+        """Events där karaktären name är med (exakt namn), i datumordning."""
+        return [self.events[i] for i in self._positions(self.keys_with_any_character((name,)))]
+
+    def _positions(self, keys: set[int]) -> list[int]:
+        # träffarnas index i events, stigande: en bisect per distinkt datum
+        out = []
+        events, ords = self.events, self.ords
+        for o in sorted({self._ord_of[k] for k in keys}):
+            for i in range(bisect_left(ords, o), bisect_right(ords, o)):
+                if id(events[i]) in keys:
+                    out.append(i)
+        return out
+
+
+class FilteredView:
+    """
+    Skrivskyddad vy över ett filterresultat: O(1) index/len, iteration,
+    ords (datum-ordinal per rad) och data_index(i) (index i hela listan).
+    Byts ut, ändras aldrig; ny version vid varje ny filtrering eller ändring.
+    """
+    __slots__ = ("_events", "_ords", "_idx", "version")
+
+    def __init__(self, events=(), ords=(), idx=(), version: int = 0):
+        self._events = events
+        self._ords = ords
+        self._idx = idx
+        self.version = version
+
+    def __len__(self):
+        return len(self._events)
+
+    def __getitem__(self, i: int) -> dict:
+        return self._events[i]
+
+    def __iter__(self):
+        return iter(self._events)
+
+    @property
+    def ords(self):
+        """Ordinaler parallellt med raderna (sorterade). Ändra inte."""
+        return self._ords
+
+    def data_index(self, i: int) -> int | None:
+        return self._idx[i] if 0 <= i < len(self._idx) else None
+
+
+def _discard(index: dict[str, set[int]], name: str, k: int):
+    s = index.get(name)
+    if s is not None:
+        s.discard(k)
+        if not s: del index[name]
+
+def _names_matching(index: dict[str, set[int]], part: str) -> set[int]:
+    # exakt namn går före; annars alla namn som innehåller part
+    # (få distinkta namn, så en genomgång av nycklarna är billig)
+    if part in index: return index[part]
+    hits = [s for name, s in index.items() if part in name]
+    if len(hits) == 1: return hits[0]
+    return set().union(*hits)
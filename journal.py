@@ -0,0 +1,210 @@
+# journal.py
+"""
+Journalfört projektformat (.tlj).
+
+<projekt>.tlj      bas-snapshot: vanlig projekt-JSON + {"journal": {"gen": n}}
+<projekt>.tlj.log  logg som bara växer, en JSON-rad per add/update/delete
+
+Sparning skriver bara operationerna sedan förra sparningen. När loggen
+passerar compact_bytes skrivs en ny snapshot och loggen töms. Generationen
+i loggens första rad måste matcha snapshoten, annars ignoreras loggen
+(krasch mellan snapshot och tömning ger alltså aldrig dubbel replay).
+"""
+import json
+import os
+from pathlib import Path
+
+from storage import NORMALIZERS, SECTIONS, iter_json, write_text_atomic
+
+JOURNAL_SUFFIX = ".tlj"
+COMPACT_BYTES = 1 << 20
+
+
+def is_journaled(path: Path | None) -> bool:
+    return path is not None and path.suffix.lower() == JOURNAL_SUFFIX
+
+
+class ProjectJournal:
+    """
+    Håller koll på vilken journal-id varje post (dict) har, samlar
+    operationer från panelerna och skriver dem till loggen vid sparning.
+    """
+    def __init__(self, path: Path, compact_bytes: int = COMPACT_BYTES):
+        self.path = path
+        self.log_path = path.with_name(path.name + ".log")
+        self.compact_bytes = compact_bytes
+        self.gen = 0
+        self._ids: dict[int, tuple[int, dict]] = {}   # id(post) -> (journal-id, post)
+        self._next_id = 0
+        self._pending: list[str] = []
+        self._log_bytes = 0
+        self._need_compact = True   # ny journal: första sparningen skriver snapshoten
+
+    #  id-hantering
+    def _assign(self, rec: dict, jid: int | None = None) -> int:
+        if jid is None:
+            jid = self._next_id
+        self._next_id = max(self._next_id, jid + 1)
+        self._ids[id(rec)] = (jid, rec)
+        return jid
+
+    def _release(self, rec: dict) -> int | None:
+        hit = self._ids.pop(id(rec), None)
+        return hit[0] if hit else None
+
+    def _reset_ids(self, data: dict):
+        """Id = position i snapshoten (samma ordning som iter_project ger)."""
+        self._ids.clear()
+        self._next_id = 0
+        for section in SECTIONS:
+            for rec in data.get(section, []):
+                self._assign(rec)
+
+    #  operationer från panelerna
+    def record(self, section: str, op: str, old: dict | None, new: dict | None):
+        """op: 'add' (new), 'update' (old -> new, kan vara samma dict) eller 'delete' (old)."""
+        if op == "delete":
+            jid = self._release(old)
+            if jid is None: return
+            entry = {"op": "delete", "s": section, "id": jid}
+        else:
+            jid = self._release(old) if (op == "update" and old is not None) else None
+            if jid is None: op = "add"
+            jid = self._assign(new, jid)
+            entry = {"op": op, "s": section, "id": jid, "rec": new}
+        # serialisera direkt: posten kan ändras på plats innan nästa sparning
+        self._pending.append(json.dumps(entry, ensure_ascii=False))
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    #  skrivning (prepare_save på UI-tråden, jobbet i bakgrunden)
+    def prepare_save(self, data: dict):
+        """
+        Ta över väntande operationer och ge ett jobb som skriver dem.
+        data ska vara en ögonblicksbild (listor kopierade, posterna ändras
+        aldrig på plats) eftersom jobbet kan köras på en annan tråd.
+        """
+        if self._need_compact or self._log_bytes > self.compact_bytes:
+            return self._prepare_compact(data)
+        lines, self._pending = self._pending, []
+        if not lines:
+            return lambda: None
+        text = "\n".join(lines) + "\n"
+        self._log_bytes += len(text.encode("utf-8"))
+        log_path = self.log_path
+
+        def job():
+            with log_path.open("a", encoding="utf-8") as fp:
+                fp.write(text)
+                fp.flush()
+                os.fsync(fp.fileno())
+        return job
+
+    def _prepare_compact(self, data: dict):
+        self.gen += 1
+        gen = self.gen
+        self._need_compact = False
+        self._pending = []
+        self._reset_ids(data)
+        header = json.dumps({"gen": gen}) + "\n"
+        self._log_bytes = len(header)
+        path, log_path = self.path, self.log_path
+
+        def job():
+            snap = {"journal": {"gen": gen}}
+            snap.update({s: data.get(s, []) for s in SECTIONS})
+            write_text_atomic(path, json.dumps(snap, indent=2, ensure_ascii=False))
+            write_text_atomic(log_path, header)
+        return job
+
+    def save_done(self, ok: bool):
+        """Anropas på UI-tråden när jobbet är klart. Misslyckad skrivning -> kompaktera nästa gång."""
+        if not ok:
+            self._need_compact = True
+
+    def flush(self, data: dict):
+        """Synkron sparning (samma som prepare_save + jobb + save_done)."""
+        self.prepare_save(data)()
+        self.save_done(True)
+
+    def compact(self, data: dict):
+        """Skriv en ny bas-snapshot och börja om loggen på nästa generation."""
+        self._prepare_compact(data)()
+        self.save_done(True)
+
+    #  läsning
+    def iter_load(self, chunk_size: int = 2000, on_progress=None):
+        """
+        Som storage.iter_project, men spelar upp loggen ovanpå snapshoten.
+        Posterna som ges ut registreras med sina journal-id.
+        """
+        self._ids.clear()
+        self._next_id = 0
+        self._pending.clear()
+
+        extras: dict = {}
+        by_id: dict[str, dict[int, dict]] = {s: {} for s in SECTIONS}
+        for section, chunk in iter_json(self.path, chunk_size, on_progress, extras=extras):
+            ids = by_id[section]
+            for rec in chunk:
+                ids[self._next_id] = rec
+                self._next_id += 1
+        self.gen = int((extras.get("journal") or {}).get("gen", 0))
+        self._log_bytes = self.log_path.stat().st_size if self.log_path.exists() else 0
+        self._need_compact = not self.log_path.exists()
+
+        for entry in self._read_log():
+            ids = by_id.get(entry.get("s"))
+            jid = entry.get("id")
+            if ids is None or not isinstance(jid, int): continue
+            if entry.get("op") == "delete":
+                ids.pop(jid, None)
+            else:
+                rec = entry.get("rec")
+                if isinstance(rec, dict):
+                    ids[jid] = NORMALIZERS[entry["s"]](rec)
+                    self._next_id = max(self._next_id, jid + 1)
+
+        for section in SECTIONS:
+            chunk: list[dict] = []
+            for jid, rec in by_id[section].items():
+                self._assign(rec, jid)
+                chunk.append(rec)
+                if len(chunk) >= chunk_size:
+                    yield section, chunk
+                    chunk = []
+            if chunk:
+                yield section, chunk
+
+    def _read_log(self):
+        if not self.log_path.exists():
+            return
+        with self.log_path.open("r", encoding="utf-8") as fp:
+            lines = iter(fp)
+            try:
+                head = json.loads(next(lines))
+            except (StopIteration, ValueError):
+                return
+            if head.get("gen") != self.gen:
+                return   # logg från en annan generation (avbruten kompaktering)
+            for line in lines:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return   # avkapad sista rad efter krasch
+
+
+#  storage-gränssnittet (load_project/save_project/iter_project)
+def iter_project(path: Path, chunk_size: int = 2000, on_progress=None):
+    yield from ProjectJournal(path).iter_load(chunk_size, on_progress)
+
+def load_project(path: Path) -> dict:
+    data = {s: [] for s in SECTIONS}
+    for section, chunk in iter_project(path):
+        data[section].extend(chunk)
+    return data
+
+def save_project(path: Path, data: dict) -> None:
+    ProjectJournal(path).compact(data)
@@ -0,0 +1,76 @@
+# query.py
+"""
+Frågesyntax för eventfiltret, t.ex.
+
+    char:Maram loc:bth date:2025-01..2025-06 "exam"
+
+char: och loc: matchar ett namn exakt, annars alla namn som innehåller
+värdet (gemener). date: tar en period (år,
+år-månad eller ett datum) eller ett intervall a..b där ena änden får
+utelämnas. Citerade fraser och övriga ord är fritext. Alla villkor måste
+gälla. En fråga utan fält och citattecken är som förut en enda delsträng.
+Svarar gör EventStore.select ur sina index.
+"""
+import re
+
+from dates import UNKNOWN, parse_period
+
+_TOKEN = re.compile(r'(\w+):("[^"]*"?|\S*)|"([^"]*)"?|(\S+)')
+_FIELDS = {"char": "chars", "character": "chars", "loc": "locs", "location": "locs", "date": "dates"}
+
+
+class Query:
+    def __init__(self):
+        self.chars: list[str] = []                  # delsträngar av karaktärsnamn
+        self.locs: list[str] = []                   # delsträngar av platsnamn
+        self.dates: list[tuple[int, int]] = []      # ordinalintervall, inklusive
+        self.texts: list[str] = []                  # fritext (delsträngar)
+        self.invalid = False                        # t.ex. otolkbart datum: inga träffar
+
+    def is_empty(self) -> bool:
+        return not (self.chars or self.locs or self.dates or self.texts or self.invalid)
+
+
+def parse_query(text: str) -> Query:
+    """Tolka en (gemen) filtertext. Tomma fält (t.ex. "char:" under skrivning) ignoreras."""
+    q = Query()
+    text = text.strip()
+    if not text: return q
+    if '"' not in text and not any(m.group(1) in _FIELDS for m in _TOKEN.finditer(text) if m.group(1)):
+        q.texts.append(text)
+        return q
+    words = []
+    for m in _TOKEN.finditer(text):
+        field, value, phrase, word = m.groups()
+        if field is not None and field in _FIELDS:
+            value = value.strip('"').strip()
+            if not value: continue
+            if field == "date":
+                rng = _date_range(value)
+                if rng is None: q.invalid = True
+                else:           q.dates.append(rng)
+            else:
+                getattr(q, _FIELDS[field]).append(value)
+        elif phrase is not None:
+            if phrase.strip(): q.texts.append(phrase)
+        else:
+            words.append(m.group(0))
+    if words:
+        q.texts.append(" ".join(words))
+    return q
+
+
+def _date_range(value: str) -> tuple[int, int] | None:
+    if ".." not in value:
+        return parse_period(value)
+    a, b = (s.strip() for s in value.split("..", 1))
+    lo, hi = 0, UNKNOWN - 1      # öppna ändar; okända datum matchar aldrig
+    if a:
+        p = parse_period(a)
+        if p is None: return None
+        lo = p[0]
+    if b:
+        p = parse_period(b)
+        if p is None: return None
+        hi = p[1]
+    return lo, hi
@@ -0,0 +1,111 @@
+# search_index.py
+"""
+Inverterat sökindex för EventsPanel.
+
+Varje event får en cachad söksträng (samma fält som fritextsökningen) och
+dess ord (\\w+) indexeras: ord -> mängd av event-nycklar. En delsträngsfråga
+delas i ordbitar; varje bit slås upp mot de indexerade ord som innehåller
+den, mängderna snittas (minst först) och bara kandidaterna kontrolleras mot
+söksträngen. En längre fråga som innehåller den förra filtrerar bara förra
+träffmängden.
+
+Nyckeln för ett event är id(ev); panelen ersätter poster vid ändring, så
+remove(gammal) + add(ny) håller indexet i takt.
+"""
+import re
+
+_WORD = re.compile(r"\w+")
+_PIECE_CACHE_MAX = 256
+
+
+def event_haystack(ev: dict) -> str:
+    chars = ", ".join(ev.get("characters", []))
+    return " ".join([ev.get("Event",""), ev.get("date",""),
+                     ev.get("activity",""), chars, ev.get("location",""),
+                     ev.get("image","")]).lower()
+
+
+class SearchIndex:
+    def __init__(self):
+        self._hay: dict[int, str] = {}              # nyckel -> söksträng
+        self._postings: dict[str, set[int]] = {}    # ord -> nycklar
+        self._pieces: dict[str, list[str]] = {}     # frågebit -> ord som innehåller den
+        self._last: tuple[str, set[int]] | None = None
+
+    def __len__(self):
+        return len(self._hay)
+
+    def clear(self):
+        self._hay.clear(); self._postings.clear()
+        self._pieces.clear(); self._last = None
+
+    def add(self, ev: dict):
+        k = id(ev)
+        hay = self._hay[k] = event_haystack(ev)
+        new_word = False
+        for word in set(_WORD.findall(hay)):
+            post = self._postings.get(word)
+            if post is None:
+                post = self._postings[word] = set()
+                new_word = True
+            post.add(k)
+        if new_word:
+            self._pieces.clear()
+        if self._last and self._last[0] in hay:
+            self._last[1].add(k)
+
+    def extend(self, events):
+        for ev in events:
+            self.add(ev)
+
+    def remove(self, ev: dict):
+        k = id(ev)
+        hay = self._hay.pop(k, None)
+        if hay is None: return
+        for word in set(_WORD.findall(hay)):
+            post = self._postings.get(word)
+            if post is not None:
+                post.discard(k)
+                if not post: del self._postings[word]
+        if self._last:
+            self._last[1].discard(k)
+
+    def search(self, q: str) -> set[int] | None:
+        """Nycklar för events vars söksträng innehåller q (gemener). None = allt matchar."""
+        if not q: return None
+        last = self._last
+        if last is not None and last[0] in q:
+            pool = last[1]                   # längre fråga: förfina förra resultatet
+        else:
+            pool = self._candidates(q)
+        hay = self._hay
+        hits = {k for k in pool if q in hay[k]}
+        self._last = (q, hits)
+        return hits
+
+    #  kandidater ur ordindexet
+    def _candidates(self, q: str) -> set[int]:
+        pieces = set(_WORD.findall(q))
+        if not pieces:
+            return set(self._hay)            # bara skiljetecken/mellanslag: kontrollera alla
+        sets = []
+        for piece in pieces:
+            post = self._postings
+            s: set[int] = set()
+            for word in self._words_containing(piece):
+                s |= post.get(word, set())
+            if not s: return set()
+            sets.append(s)
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def _words_containing(self, piece: str) -> list[str]:
+        words = self._pieces.get(piece)
+        if words is None:
+            # börja från en cachad kortare bit om det finns en (delmängd av orden)
+            base = next((w for p, w in self._pieces.items() if p in piece), None)
+            words = [w for w in (base if base is not None else self._postings) if piece in w]
+            if len(self._pieces) >= _PIECE_CACHE_MAX:
+                self._pieces.clear()
+            self._pieces[piece] = words
+        return words
@@ -0,0 +1,303 @@
+# sqlite_store.py
+"""
+SQLite-lagring för projekt (.tldb).
+
+Panelernas ändringar skrivs igenom direkt (record) i en öppen
+transaktion; "Save" är en commit. Första sparningen bygger filen på
+sparningstråden med en egen anslutning. Events läses in i datumordning ur
+indexet på ordinal. Filtrering sköts av EventStore i minnet.
+
+Filen märks med PRAGMA application_id. Schemat skapas bara i en tom fil
+eller en som redan är en tidslinjedatabas, så en främmande databas
+ändras aldrig.
+"""
+import errno
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+from dates import date_ordinal
+from storage import SECTIONS, normalize_event, normalize_item
+
+SQLITE_SUFFIXES = (".tldb",)
+APPLICATION_ID = 0x544C4442          # "TLDB"
+ITEM_SECTIONS = ("characters", "locations")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id    INTEGER PRIMARY KEY,
+    kind  TEXT NOT NULL,
+    pos   INTEGER NOT NULL,
+    name  TEXT NOT NULL,
+    data  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_kind_pos  ON items(kind, pos);
+CREATE INDEX IF NOT EXISTS items_kind_name ON items(kind, name);
+
+CREATE TABLE IF NOT EXISTS events (
+    id       INTEGER PRIMARY KEY,
+    ord      INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_ord      ON events(ord, id);
+
+-- frågorna sköts av EventStore i minnet; äldre filer hade index för dem
+DROP INDEX IF EXISTS events_location;
+DROP TABLE IF EXISTS event_characters;
+"""
+
+
+def is_sqlite(path: Path | None) -> bool:
+    return path is not None and path.suffix.lower() in SQLITE_SUFFIXES
+
+
+def _claim(db: sqlite3.Connection, path: Path):
+    """Märk och skapa schemat, men bara i en tom fil eller en egen databas."""
+    app_id = db.execute("PRAGMA application_id").fetchone()[0]
+    if app_id != APPLICATION_ID:
+        tables = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        # 0 + bara våra tabeller: skapad före märkningen
+        if app_id != 0 or not tables <= {"items", "events", "event_characters"}:
+            raise ValueError(f"{path.name} is not a timeline database")
+        db.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+    db.executescript(_SCHEMA)
+
+
+def _dumps(rec: dict) -> str:
+    return json.dumps(rec, ensure_ascii=False)
+
+def _insert_event(db: sqlite3.Connection, ev: dict) -> int:
+    cur = db.execute("INSERT INTO events(ord, location, data) VALUES (?, ?, ?)",
+                     (date_ordinal(ev.get("date", "")), ev.get("location", ""), _dumps(ev)))
+    return cur.lastrowid
+
+def _write_all(db: sqlite3.Connection, data: dict):
+    db.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+    db.executescript(_SCHEMA)
+    for kind in ITEM_SECTIONS:
+        db.executemany("INSERT INTO items(kind, pos, name, data) VALUES (?, ?, ?, ?)",
+                       [(kind, i, it.get("name", ""), _dumps(it))
+                        for i, it in enumerate(data.get(kind, []))])
+    for ev in data.get("events", []):
+        _insert_event(db, ev)
+
+
+class SqliteProject:
+    """
+    Ett öppet .tldb-projekt. Samma gränssnitt som journal.ProjectJournal
+    (iter_load/record/prepare_save/save_done).
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._ids: dict[int, tuple[int, dict]] = {}   # id(post) -> (rowid, post)
+        # medan filen byggs på arbetstråden finns ingen anslutning: ändringar köas
+        self._building = False
+        self._snapshot: dict | None = None
+        self._backlog: list[tuple] = []
+        self._commit_after_build = False
+        self._built = [False]                # sätts av byggjobbet när filen är på plats
+        self._needs_build = False            # bygget misslyckades: filen saknar det som sparats
+
+    def _conn(self) -> sqlite3.Connection:
+        # skapar aldrig filen (det gör bara byggjobbet), som en JSON-fil som saknas
+        if self._db is None:
+            if not self.path.is_file():
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), str(self.path))
+            db = sqlite3.connect(self.path.resolve().as_uri() + "?mode=rw", uri=True)
+            try:
+                _claim(db, self.path)
+            except BaseException:
+                db.close()
+                raise
+            self._db = db
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.rollback()
+            self._db.close()
+            self._db = None
+
+    #  id-hantering
+    def _assign(self, rec: dict, rowid: int):
+        self._ids[id(rec)] = (rowid, rec)
+
+    def _release(self, rec: dict | None) -> int | None:
+        hit = self._ids.pop(id(rec), None) if rec is not None else None
+        return hit[0] if hit else None
+
+    #  operationer från panelerna (skrivs igenom, committas vid sparning)
+    def record(self, section: str, op: str, old: dict | None, new: dict | None):
+        if self._building:
+            # panelerna byter ut poster i stället för att ändra dem, så referenser räcker
+            self._backlog.append((section, op, old, new))
+            return
+        if self._needs_build:
+            return          # nästa sparning bygger hela filen från panelerna
+        db = self._conn()
+        rowid = self._release(old)
+        if op == "delete":
+            if rowid is None: return
+            if section == "events":
+                db.execute("DELETE FROM events WHERE id = ?", (rowid,))
+            else:
+                db.execute("DELETE FROM items WHERE id = ?", (rowid,))
+            return
+        if section == "events":
+            if rowid is None:
+                rowid = _insert_event(db, new)
+            else:
+                db.execute("UPDATE events SET ord = ?, location = ?, data = ? WHERE id = ?",
+                           (date_ordinal(new.get("date", "")), new.get("location", ""), _dumps(new), rowid))
+        elif rowid is None:
+            pos = db.execute("SELECT COALESCE(MAX(pos) + 1, 0) FROM items WHERE kind = ?",
+                             (section,)).fetchone()[0]
+            rowid = db.execute("INSERT INTO items(kind, pos, name, data) VALUES (?, ?, ?, ?)",
+                               (section, pos, new.get("name", ""), _dumps(new))).lastrowid
+        else:
+            db.execute("UPDATE items SET name = ?, data = ? WHERE id = ?",
+                       (new.get("name", ""), _dumps(new), rowid))
+        self._assign(new, rowid)
+
+    @property
+    def has_pending(self) -> bool:
+        return (self._needs_build or bool(self._backlog)
+                or (self._db is not None and self._db.in_transaction))
+
+    #  skrivning
+    def prepare_save(self, data: dict):
+        """
+        Spara = commit av det som redan skrivits igenom. Anslutningen hör
+        till UI-tråden, så commit (som bara kostar ändringarna) sker här och
+        bakgrundsjobbet blir tomt. Första sparningen (och 'Save As…') bygger
+        hela filen i bakgrunden, se _prepare_build. data är en ögonblicksbild.
+        """
+        if self._building:
+            self._commit_after_build = True     # ändringarna ligger i kön, committas i save_done
+            built = self._built
+
+            def job():
+                # körs efter byggjobbet (en sparningstråd): misslyckades det är inget sparat
+                if not built[0]:
+                    raise OSError("the database could not be created")
+            return job
+        if self._needs_build or self._db is None or not self.path.exists():
+            return self._prepare_build(data)
+        self._db.commit()
+        return lambda: None
+
+    def _prepare_build(self, data: dict):
+        self.close()
+        self._ids.clear()
+        self._building, self._snapshot, self._backlog = True, data, []
+        self._commit_after_build = False
+        self._built = built = [False]
+        path = self.path
+
+        def job():
+            # arbetstråd, egen anslutning
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.unlink(missing_ok=True)
+            try:
+                db = sqlite3.connect(tmp)
+                try:
+                    with db:
+                        _write_all(db, data)
+                finally:
+                    db.close()
+                os.replace(tmp, path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            built[0] = True
+        return job
+
+    def save_done(self, ok: bool):
+        """UI-tråden, efter jobbet. Efter en bygg: anslut, koppla rowid och spela upp kön."""
+        if not self._building:
+            return
+        data, backlog = self._snapshot, self._backlog
+        self._building, self._snapshot, self._backlog = False, None, []
+        self._needs_build = not ok
+        if not ok:
+            return                              # ingen anslutning: nästa sparning bygger om från panelerna
+        db = self._conn()
+        # rowid följer insättningsordningen i _write_all
+        for kind in ITEM_SECTIONS:
+            rows = db.execute("SELECT id FROM items WHERE kind = ? ORDER BY pos", (kind,)).fetchall()
+            for (rowid,), rec in zip(rows, data.get(kind, [])):
+                self._assign(rec, rowid)
+        rows = db.execute("SELECT id FROM events ORDER BY id").fetchall()
+        for (rowid,), ev in zip(rows, data.get("events", [])):
+            self._assign(ev, rowid)
+        for op in backlog:
+            self.record(*op)
+        if self._commit_after_build:
+            db.commit()
+
+    def flush(self, data: dict):
+        """Synkron sparning (samma som prepare_save + jobb + save_done)."""
+        job = self.prepare_save(data)
+        try:
+            job()
+        except BaseException:
+            self.save_done(False)
+            raise
+        self.save_done(True)
+
+    def compact(self, data: dict):
+        """Bygg om hela databasen från data, synkront."""
+        if self._building:
+            raise RuntimeError("save in progress")
+        self.close()
+        self.flush(data)
+
+    #  läsning
+    def iter_load(self, chunk_size: int = 2000, on_progress=None):
+        """Som storage.iter_project; events kommer i datumordning från indexet."""
+        self._ids.clear()
+        db = self._conn()
+        total = max(1, db.execute("SELECT (SELECT COUNT(*) FROM items) + (SELECT COUNT(*) FROM events)").fetchone()[0])
+        done = 0
+        queries = {
+            "characters": ("SELECT id, data FROM items WHERE kind = 'characters' ORDER BY pos", normalize_item),
+            "locations":  ("SELECT id, data FROM items WHERE kind = 'locations' ORDER BY pos", normalize_item),
+            "events":     ("SELECT id, data FROM events ORDER BY ord, id", normalize_event),
+        }
+        for section in SECTIONS:
+            sql, norm = queries[section]
+            cur = db.execute(sql)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows: break
+                chunk = []
+                for rowid, raw in rows:
+                    rec = norm(json.loads(raw))
+                    self._assign(rec, rowid)
+                    chunk.append(rec)
+                yield section, chunk
+                done += len(rows)
+                if on_progress: on_progress(done, total)
+
+
+#  storage-gränssnittet (load_project/save_project/iter_project)
+def iter_project(path: Path, chunk_size: int = 2000, on_progress=None):
+    store = SqliteProject(path)
+    try:
+        yield from store.iter_load(chunk_size, on_progress)
+    finally:
+        store.close()
+
+def load_project(path: Path) -> dict:
+    data = {s: [] for s in SECTIONS}
+    for section, chunk in iter_project(path):
+        data[section].extend(chunk)
+    return data
+
+def save_project(path: Path, data: dict) -> None:
+    store = SqliteProject(path)
+    store.compact(data)
+    store.close()
@@ -1,16 +1,196 @@
 import json
+import os
 from pathlib import Path
 
 SCHEMA = {"characters": [], "locations": [], "events": []}
+SECTIONS = ("characters", "locations", "events")
+
+_READ_SIZE = 1 << 16
+_WS = " \t\r\n"
+
+
+def _backend(path: Path):
+    """Modul för format som inte är vanlig JSON (importeras vid behov), annars None."""
+    suffix = path.suffix.lower()
+    if suffix == ".tlj":
+        import journal
+        return journal
+    if suffix == ".tldb":
+        import sqlite_store
+        return sqlite_store
+    if suffix in (".tlz", ".tlxz"):
+        import compact_store
+        return compact_store
+    return None
 
 def new_empty_project() -> dict:
     return {"characters": [], "locations": [], "events": []}
 
 def load_project(path: Path) -> dict:
+    backend = _backend(path)
+    if backend is not None:
+        return backend.load_project(path)
     data = json.loads(path.read_text(encoding="utf-8"))
     return {**SCHEMA, **data}
 
 def save_project(path: Path | None, data: dict) -> None:
     if path is None:
         raise ValueError("No file path selected. Use 'Save As…' first.")
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    backend = _backend(path)
+    if backend is not None:
+        return backend.save_project(path, data)
+    write_text_atomic(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+def write_bytes_atomic(path: Path, payload: bytes) -> None:
+    """Skriv till en temporär fil bredvid och byt namn, så att filen aldrig blir halvskriven."""
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fp:
+        fp.write(payload)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, path)
+
+def write_text_atomic(path: Path, text: str) -> None:
+    write_bytes_atomic(path, text.encode("utf-8"))
+
+
+#  Normalisering (delas av panelerna och den strömmande läsaren)
+def normalize_item(it: dict) -> dict:
+    """Character/Location: se till att name/description/image finns. Ändrar på plats."""
+    it["name"] = it.get("name", "")
+    it["description"] = it.get("description", "")
+    it["image"] = it.get("image", "")
+    return it
+
+def normalize_event(ev: dict) -> dict:
+    """Event: gammal 'character' -> 'characters'[], trimmade fält. Ändrar på plats."""
+    if "characters" not in ev:
+        ch = ev.get("character", "").strip()
+        ev["characters"] = [ch] if ch else []
+    else:
+        ev["characters"] = [s for s in (ev.get("characters") or []) if str(s).strip()]
+    ev["activity"] = ev.get("activity", "").strip()
+    ev["location"] = ev.get("location", "").strip()
+    ev["image"] = (ev.get("image", "") or "").strip()
+    ev.pop("character", None)
+    return ev
+
+NORMALIZERS = {"characters": normalize_item, "locations": normalize_item, "events": normalize_event}
+
+
+#  Strömmande läsning
+class _Reader:
+    """Liten buffert över en textfil som raw_decode kan jobba mot bit för bit."""
+    def __init__(self, fp):
+        self.fp = fp
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.consumed = 0   # tecken som redan kastats ur bufferten
+        self._dec = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof: return False
+        chunk = self.fp.read(_READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.consumed += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Nästa tecken som inte är whitespace ('' vid filslut)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf): return self.buf[self.pos]
+            if not self._fill(): return ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"Invalid project file: expected '{ch}' at offset {self.offset}")
+        self.pos += 1
+
+    def value(self):
+        """Avkoda ett JSON-värde; läs mer om bufferten tar slut mitt i värdet."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self._dec.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill(): continue
+                raise
+            # ett tal precis vid buffertens slut kan fortsätta i nästa block
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    @property
+    def offset(self) -> int:
+        return self.consumed + self.pos
+
+
+def iter_project(path: Path, chunk_size: int = 2000, on_progress=None):
+    """
+    Läs ett projekt utan att bygga hela JSON-trädet i minnet.
+    Ger (sektion, [normaliserade poster]) i bitar om högst chunk_size,
+    där sektion är 'characters', 'locations' eller 'events'.
+    on_progress(lästa_byte, totalt) anropas efter varje bit.
+    """
+    backend = _backend(path)
+    if backend is not None:
+        yield from backend.iter_project(path, chunk_size, on_progress)
+    else:
+        yield from iter_json(path, chunk_size, on_progress)
+
+def iter_json(path: Path, chunk_size: int = 2000, on_progress=None, extras: dict | None = None):
+    """iter_project för en JSON-fil, oavsett filändelse. Övriga nycklar på toppnivån hamnar i extras."""
+    total = max(1, path.stat().st_size)
+    with path.open("r", encoding="utf-8") as fp:
+        rd = _Reader(fp)
+
+        def progress():
+            if on_progress:
+                on_progress(min(fp.buffer.tell(), total), total)
+
+        rd.expect("{")
+        if rd.peek() == "}":
+            progress(); return
+        while True:
+            key = rd.value()
+            rd.expect(":")
+            norm = NORMALIZERS.get(key)
+            if norm is None or rd.peek() != "[":
+                val = rd.value()   # okänd nyckel: läs förbi värdet
+                if extras is not None: extras[key] = val
+            else:
+                rd.expect("[")
+                chunk: list[dict] = []
+                if rd.peek() == "]":
+                    rd.pos += 1
+                else:
+                    while True:
+                        rec = rd.value()
+                        if isinstance(rec, dict):
+                            chunk.append(norm(rec))
+                            if len(chunk) >= chunk_size:
+                                yield key, chunk
+                                progress()
+                                chunk = []
+                        sep = rd.peek()
+                        rd.pos += 1
+                        if sep == "]": break
+                        if sep != ",":
+                            raise ValueError(f"Invalid project file: bad list in '{key}'")
+                if chunk:
+                    yield key, chunk
+                    progress()
+            sep = rd.peek()
+            rd.pos += 1
+            if sep == "}": break
+            if sep != ",":
+                raise ValueError("Invalid project file: expected ',' or '}'")
+        progress()
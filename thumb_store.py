@@ -0,0 +1,116 @@
+# thumb_store.py
+"""
+Miniatyrer på disk bredvid projektet: <projekt>.thumbs/
+
+Filnamnet är innehållsadresserat: sha1(absolut sökväg, mtime, storlek) plus
+boxen, t.ex. 3f2a…_40x40.png. En ändrad källfil får alltså ett nytt namn och
+den gamla miniatyren blir föräldralös. prune() tar bort filer vars källa inte
+längre används eller har ändrats, och de äldsta (mtime, uppdateras vid
+läsning) tills katalogen ryms i cap_bytes.
+
+Bara PIL, inget Tk: anropas från ImageCaches arbetstrådar.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+try:
+    from PIL import Image
+    PIL_OK = True
+except Exception:
+    PIL_OK = False
+
+CAP_BYTES = 64 * 1024 * 1024
+MAX_BOX = 256             # större bilder (dialogens huvudbild) sparas inte
+SUFFIX = ".thumbs"
+
+
+def thumb_dir(project_path: Path) -> Path:
+    return project_path.with_name(project_path.name + SUFFIX)
+
+
+def source_hash(path: str, sig: tuple[int, int]) -> str:
+    s = f"{os.path.abspath(path)}|{sig[0]}|{sig[1]}"
+    return hashlib.sha1(s.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class ThumbStore:
+    def __init__(self, root: Path, cap_bytes: int = CAP_BYTES):
+        self.root = Path(root)
+        self.cap_bytes = cap_bytes
+        self._lock = threading.Lock()     # en prune i taget
+        self._made = False
+        self.reads = 0
+        self.writes = 0
+
+    def wants(self, box: tuple[int, int]) -> bool:
+        return PIL_OK and max(box) <= MAX_BOX
+
+    def _file(self, path: str, sig: tuple[int, int], box: tuple[int, int]) -> Path:
+        return self.root / f"{source_hash(path, sig)}_{box[0]}x{box[1]}.png"
+
+    def load(self, path: str, sig: tuple[int, int], box: tuple[int, int]):
+        """Sparad miniatyr som PIL-bild, eller None."""
+        f = self._file(path, sig, box)
+        try:
+            with Image.open(f) as im:
+                im.load()
+            os.utime(f)                   # nyligen använd: sparas längst vid prune
+        except (OSError, ValueError):
+            return None
+        self.reads += 1
+        return im
+
+    def save(self, path: str, sig: tuple[int, int], box: tuple[int, int], im):
+        f = self._file(path, sig, box)
+        if im.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            im = im.convert("RGBA" if "A" in im.mode else "RGB")
+        tmp = f.with_name(f"{f.name}.{threading.get_ident()}.tmp")
+        try:
+            if not self._made:
+                self.root.mkdir(parents=True, exist_ok=True)
+                self._made = True
+            im.save(tmp, "PNG")
+            os.replace(tmp, f)
+        except OSError:
+            try: tmp.unlink()
+            except OSError: pass
+            return
+        self.writes += 1
+
+    def prune(self, sources) -> int:
+        """
+        sources: (sökväg, sig) för bilderna projektet använder. Tar bort övriga
+        miniatyrer och sedan de äldsta över cap_bytes. Returnerar antal borttagna.
+        """
+        keep = {source_hash(p, s) for p, s in sources}
+        removed = 0
+        with self._lock:
+            try:
+                entries = list(os.scandir(self.root))
+            except OSError:
+                return 0
+            live = []
+            for e in entries:
+                if not e.is_file():
+                    continue
+                if e.name.split("_", 1)[0] in keep and e.name.endswith(".png"):
+                    st = e.stat()
+                    live.append((st.st_mtime, st.st_size, e.path))
+                    continue
+                try:
+                    os.unlink(e.path); removed += 1     # föräldralös (eller en gammal .tmp)
+                except OSError:
+                    pass
+            total = sum(size for _, size, _ in live)
+            live.sort()
+            for _, size, p in live:
+                if total <= self.cap_bytes:
+                    break
+                try:
+                    os.unlink(p); removed += 1
+                    total -= size
+                except OSError:
+                    pass
+        return removed
@@ -0,0 +1,145 @@
+# timeline_axis.py
+"""
+Datumaxelns ticks: välj ett intervall (dag, vecka, månad, kvartal, år) som
+får plats i bredden och ge bara de ticks som ska ritas.
+
+Med jämn fördelning (en slot per unikt datum) hamnar ticks på första
+datumet i varje intervall; med proportionell tidsaxel på kalendergränserna.
+I båda fallen gallras ticks som skulle hamna närmare än LABEL_PX.
+
+Axis sköter själva avbildningen datum <-> x.
+"""
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from dates import format_date_dmy
+
+TICK_UNITS = ("day", "week", "month", "quarter", "year")
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30.4, "quarter": 91.3, "year": 365.25}
+LABEL_PX = 80           # minsta avstånd mellan två etiketter
+
+
+def tick_label(unit: str, o: int) -> str:
+    d = date.fromordinal(o)
+    if unit in ("day", "week"): return format_date_dmy(d)
+    if unit == "month":         return f"{d.month}/{d.year}"
+    if unit == "quarter":       return f"Q{(d.month - 1) // 3 + 1} {d.year}"
+    return str(d.year)
+
+
+def slot_ticks(axis: list[int], step: float, buckets) -> list[tuple[float, str]]:
+    """Jämn axel: (x relativt axelns start, etikett). buckets(unit) -> hinkar med .lo (timeline_lod)."""
+    n = len(axis)
+    unit = next((u for u in TICK_UNITS if n / max(1, len(buckets(u))) * step >= LABEL_PX), "year")
+    return _thin((b.lo * step, tick_label(unit, axis[b.lo])) for b in buckets(unit))
+
+
+def calendar_ticks(lo: int, hi: int, px_per_day: float) -> list[tuple[float, str]]:
+    """Proportionell axel: ticks på kalendergränser i [lo, hi], x = (o - lo) * px_per_day."""
+    unit = next((u for u in TICK_UNITS if UNIT_DAYS[u] * px_per_day >= LABEL_PX), "year")
+    return _thin(((o - lo) * px_per_day, tick_label(unit, o)) for o in _boundaries(unit, lo, hi))
+
+
+def _boundaries(unit: str, lo: int, hi: int):
+    if unit in ("day", "week"):
+        step = 1 if unit == "day" else 7
+        o = lo if unit == "day" else lo + (-(lo - 1)) % 7     # första måndagen >= lo
+        yield from range(o, hi + 1, step)
+        return
+    months = {"month": 1, "quarter": 3, "year": 12}[unit]
+    d = date.fromordinal(lo)
+    m = d.year * 12 + d.month - 1
+    m += (-m) % months                                   # första gränsen >= lo:s månad
+    while True:
+        y, mo = divmod(m, 12)
+        if y > 9999: return
+        o = date(y, mo + 1, 1).toordinal()
+        if o > hi: return
+        if o >= lo:
+            yield o
+        m += months
+
+
+def _thin(ticks) -> list[tuple[float, str]]:
+    out: list[tuple[float, str]] = []
+    for x, label in ticks:
+        if not out or x - out[-1][0] >= LABEL_PX:
+            out.append((x, label))
+    return out
+
+
+class Axis:
+    """
+    Datum <-> x för timelinen. ords är de unika kända ordinalerna, sorterade;
+    slot j ligger på start + j * step (jämn fördelning) eller på
+    start + (ords[j] - ords[0]) * px_per_day (proportionell). Datum -> slot
+    är en dict (O(1)), x -> datum aritmetik plus bisect (O(log n)).
+    Byggs om när datumen ändras; layout() när bredd/pan/axeltyp ändras.
+    """
+    def __init__(self, ords: list[int] | None = None):
+        self.ords = ords or []
+        self._slot = {o: j for j, o in enumerate(self.ords)}
+        self.start = 0.0
+        self.step = 0.0               # px per slot (proportionell: genomsnitt)
+        self.px_per_day = 0.0         # > 0 = proportionell axel
+        self.single_x = 0.0           # x när det bara finns ett datum
+
+    def __len__(self):
+        return len(self.ords)
+
+    def layout(self, start: float, usable: float, single_x: float, proportional: bool):
+        n = len(self.ords)
+        self.start, self.single_x = start, single_x
+        self.step = usable / (n - 1) if n > 1 else 0.0
+        self.px_per_day = usable / (self.ords[-1] - self.ords[0]) if n > 1 and proportional else 0.0
+
+    def shift(self, dx: float):
+        self.start += dx
+        self.single_x += dx
+
+    #  datum -> x
+    def slot_x(self, j: int) -> float:
+        if len(self.ords) == 1: return self.single_x
+        if self.px_per_day:
+            return self.start + (self.ords[j] - self.ords[0]) * self.px_per_day
+        return self.start + j * self.step
+
+    def date_to_x(self, o: int) -> float:
+        if not self.ords: return self.start
+        if self.px_per_day and len(self.ords) > 1:
+            return self.start + (o - self.ords[0]) * self.px_per_day
+        j = self._slot.get(o)
+        return self.slot_x(self.nearest_slot(o) if j is None else j)
+
+    def nearest_slot(self, o: int) -> int:
+        i = bisect_left(self.ords, o)
+        if i == len(self.ords): return i - 1
+        if i > 0 and o - self.ords[i - 1] <= self.ords[i] - o: return i - 1
+        return i
+
+    #  x -> datum
+    def x_to_ordinal(self, x: float) -> int | None:
+        """Närmaste datum för x (jämn axel: närmaste slot; proportionell: vilket datum som helst i spannet)."""
+        ords = self.ords
+        if not ords: return None
+        if len(ords) == 1: return ords[0]
+        if self.px_per_day:
+            o = ords[0] + round((x - self.start) / self.px_per_day)
+            return max(ords[0], min(o, ords[-1]))
+        j = round((x - self.start) / self.step)
+        return ords[max(0, min(j, len(ords) - 1))]
+
+    def visible_slots(self, xl: float, xr: float) -> tuple[int, int]:
+        """Slots (inklusive) vars x ligger i [xl, xr]; tomt om lo > hi."""
+        ords, n = self.ords, len(self.ords)
+        if n == 0: return 0, -1
+        if n == 1: return (0, 0) if xl <= self.single_x <= xr else (0, -1)
+        if self.px_per_day:
+            o0, ppd = ords[0], self.px_per_day
+            lo = bisect_left(ords, o0 + math.ceil((xl - self.start) / ppd))
+            hi = bisect_right(ords, o0 + math.floor((xr - self.start) / ppd)) - 1
+            return lo, hi
+        lo = math.ceil((xl - self.start) / self.step)
+        hi = math.floor((xr - self.start) / self.step)
+        return max(0, lo), min(n - 1, hi)
@@ -1,13 +1,11 @@
 # ui/crud_panel.py
 import tkinter as tk
 from tkinter import ttk, filedialog
-from pathlib import Path
 
-try:
-    from PIL import Image, ImageTk
-    PIL_OK = True
-except Exception:
-    PIL_OK = False
+from entity_registry import EntityRegistry
+from storage import normalize_item
+from ui.image_cache import ImageCache
+from ui.virtual_list import VirtualList
 
 
 class CrudPanel(ttk.Frame):
@@ -18,13 +16,20 @@ class CrudPanel(ttk.Frame):
     - Visar färger i listan via optional color_getter(name)->hex.
     """
     PREVIEW_SIZE = (220, 160)
+    PREVIEW_DELAY_MS = 200          # preview laddas först när Image-fältet stått still så länge
 
-    def __init__(self, master, title: str, on_change, color_getter=None, *args, **kwargs):
+    def __init__(self, master, title: str, on_change, color_getter=None, on_record=None,
+                 images: ImageCache | None = None, *args, **kwargs):
         super().__init__(master, *args, **kwargs)
         self.on_change = on_change
         self.color_getter = color_getter  # optional: func(name)-> "#rrggbb"
+        self.on_record = on_record        # optional: func(op, old, new) för journalen
+        self.images = images if images is not None else ImageCache(self)   # delas med timelinen om den skickas in
         self._items: list[dict[str, str]] = []
+        self.registry = EntityRegistry(lambda: self._items, color_getter)  # namn -> post
         self._preview_img = None
+        self._preview_job = None          # väntande after() för preview (debounce)
+        self._preview_ticket = None       # beställd avkodning (ImageCache.fetch)
 
         ttk.Label(self, text=title, font=("TkDefaultFont", 11, "bold")).grid(
             row=0, column=0, columnspan=4, pady=(2, 6), sticky="w"
@@ -63,47 +68,48 @@ class CrudPanel(ttk.Frame):
         ttk.Button(self, text="Update", command=self.update_item).grid(row=5, column=1, pady=2, sticky="ew")
         ttk.Button(self, text="Delete", command=self.delete_item).grid(row=5, column=2, pady=2, sticky="ew")
 
-        # Listbox
-        self.listbox = tk.Listbox(self, height=10)
+        # Listbox (virtualiserad: bara synliga rader formateras)
+        self.listbox = VirtualList(self, height=10, on_select=self.fill_form_from_selection)
         self.listbox.grid(row=6, column=0, columnspan=4, sticky="nsew", pady=(6, 0))
-        self.listbox.bind("<<ListboxSelect>>", self.fill_form_from_selection)
 
         # Layout
         self.columnconfigure(1, weight=1)
         self.rowconfigure(6, weight=1)
         self.rowconfigure(4, weight=0)
 
-        # Uppdatera preview när texten ändras
-        self.image_var.trace_add("write", lambda *_: self._refresh_preview())
+        # Uppdatera preview när texten ändras (samlat, inte per tangenttryck)
+        self.image_var.trace_add("write", lambda *_: self._schedule_preview())
 
     def data(self) -> list[dict]:
         return self._items
 
     def set_data(self, items: list[dict]):
-        self._items = []
-        for it in (items or []):
-            it = dict(it)
-            it["name"] = it.get("name", "")
-            it["description"] = it.get("description", "")
-            it["image"] = it.get("image", "")
-            self._items.append(it)
+        self.end_load([normalize_item(dict(it)) for it in (items or [])])
+
+    # inkrementell laddning (storage.iter_project): bitarna läggs i en lista
+    # vid sidan av, panelen visar den gamla datan tills end_load byter in den
+    def begin_load(self) -> list[dict]:
+        return []
+
+    def end_load(self, items: list[dict]):
+        self._items = items
+        self.registry.rebuild()
         self.refresh()
         self._refresh_preview()
 
     def refresh(self):
-        self.listbox.delete(0, tk.END)
-        for idx, it in enumerate(self._items):
-            nm = it.get("name", "")
-            label = nm + ("  [🖼]" if it.get("image") else "")
-            self.listbox.insert(tk.END, label)
-            if self.color_getter and nm:
-                try:
-                    clr = self.color_getter(nm)
-                    self.listbox.itemconfig(idx, foreground=clr)
-                except Exception:
-                    pass
+        self.listbox.set_rows(len(self._items), self._row_label,
+                              self._row_color if self.color_getter else None)
         self.on_change()
 
+    def _row_label(self, i: int) -> str:
+        it = self._items[i]
+        return it.get("name", "") + ("  [🖼]" if it.get("image") else "")
+
+    def _row_color(self, i: int):
+        nm = self._items[i].get("name", "")
+        return self.color_getter(nm) if nm else None
+
     def selected_index(self):
         sel = self.listbox.curselection()
         return sel[0] if sel else None
@@ -111,7 +117,7 @@ class CrudPanel(ttk.Frame):
     def _select_and_fill(self, idx: int):
         """Välj given post i listan och fyll formuläret (används efter Add/Update)."""
         if 0 <= idx < len(self._items):
-            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_clear()
             self.listbox.selection_set(idx)
             self.listbox.see(idx)
             self.fill_form_from_selection()
@@ -136,6 +142,8 @@ class CrudPanel(ttk.Frame):
             "image": self.image_var.get().strip(),
         })
         new_idx = len(self._items) - 1
+        self.registry.add(self._items[new_idx])
+        self._record("add", None, self._items[new_idx])
         self.refresh()
         self._select_and_fill(new_idx)
 
@@ -143,11 +151,14 @@ class CrudPanel(ttk.Frame):
         i = self.selected_index()
         if i is None:
             return
+        old = self._items[i]
         self._items[i] = {
             "name": self.name_var.get().strip(),
             "description": self.desc_var.get().strip(),
             "image": self.image_var.get().strip(),
         }
+        self.registry.replace(old, self._items[i])
+        self._record("update", old, self._items[i])
         self.refresh()
         self._select_and_fill(i)
 
@@ -155,11 +166,17 @@ class CrudPanel(ttk.Frame):
         i = self.selected_index()
         if i is None:
             return
-        del self._items[i]
+        old = self._items.pop(i)
+        self.registry.remove(old)
+        self._record("delete", old, None)
         self.refresh()
         # välj närmaste kvarvarande
         self._select_and_fill(min(i, len(self._items) - 1))
 
+    def _record(self, op: str, old, new):
+        if self.on_record:
+            self.on_record(op, old, new)
+
     def clear_form(self):
         self.name_var.set("")
         self.desc_var.set("")
@@ -181,21 +198,37 @@ class CrudPanel(ttk.Frame):
     def _clear_image(self):
         self.image_var.set("")
 
+    def _schedule_preview(self):
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+        self._preview_job = self.after(self.PREVIEW_DELAY_MS, self._refresh_preview)
+
     def _refresh_preview(self):
+        """Visa bilden i Image-fältet. Avkodas i bakgrunden; redan sedda bilder tas ur cachen."""
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+            self._preview_job = None
+        self.images.cancel(self._preview_ticket)
+        self._preview_ticket = None
         path = self.image_var.get().strip()
-        if not path or not Path(path).exists():
-            self.preview.configure(image="", text="")
-            self._preview_img = None
+        if not self.images.exists(path):
+            self._show_preview(path, None, missing=True)
             return
-        try:
-            if PIL_OK:
-                im = Image.open(path)
-                im.thumbnail(self.PREVIEW_SIZE)
-                img = ImageTk.PhotoImage(im)
-            else:
-                img = tk.PhotoImage(file=path)
+        img, ticket = self.images.fetch(path, self.PREVIEW_SIZE,
+                                        lambda img: self._show_preview(path, img))
+        if ticket is None:
+            self._show_preview(path, img)
+        else:
+            self._preview_ticket = ticket     # förra bilden visas tills den nya är klar
+
+    def _show_preview(self, path: str, img, missing: bool = False):
+        if path != self.image_var.get().strip():
+            return                            # fältet har ändrats sedan beställningen
+        self._preview_ticket = None
+        if img is not None:
             self.preview.configure(image=img, text="")
-            self._preview_img = img
-        except Exception:
+        elif missing:
+            self.preview.configure(image="", text="")
+        else:
             self.preview.configure(image="", text=f"(Could not load)\n{path}")
-            self._preview_img = None
+        self._preview_img = img
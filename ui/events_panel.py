@@ -3,45 +3,9 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 from datetime import date
 
-_MONTHS = {
-    "jan": 1, "januari": 1, "feb": 2, "februari": 2,
-    "mar": 3, "mars": 3, "march": 3, "apr": 4, "april": 4,
-    "maj": 5, "may": 5, "jun": 6, "juni": 6, "june": 6,
-    "jul": 7, "juli": 7, "july": 7, "aug": 8, "augusti": 8, "august": 8,
-    "sep": 9, "sept": 9, "september": 9, "okt": 10, "oktober": 10, "oct": 10, "october": 10,
-    "nov": 11, "november": 11, "dec": 12, "december": 12,
-}
-def _parse_date_str(s: str):
-    if not s: return (9999, 12, 31)
-    t = s.strip().lower()
-    m = re.match(r"^\s*(\d{4})[\/\-\.\s](\d{1,2})[\/\-\.\s](\d{1,2})\s*$", t)
-    if m:
-        y,mo,d = map(int,m.groups()); return (y, max(1,min(mo,12)), max(1,min(d,31)))
-    m = re.match(r"^\s*(\d{1,2})[\/\-\.\s](\d{1,2})(?:[\/\-\.\s](\d{2,4}))?\s*$", t)
-    if m:
-        d,mo,y = m.groups(); d=int(d); mo=int(mo)
-        if y is None: y = date.today().year
-        else:
-            y=int(y); y += 2000 if y<50 else (1900 if y<100 else 0)
-        return (y, max(1,min(mo,12)), max(1,min(d,31)))
-    m = re.match(r"^\s*(\d{1,2})\s+([a-zåäö\.]+)\s*(\d{2,4})?\s*$", t)
-    if m:
-        d,mon_txt,y = m.groups(); mon=_MONTHS.get(mon_txt.rstrip("."), None)
-        if mon:
-            d=int(d)
-            if y is None: y = date.today().year
-            else:
-                y=int(y); y += 2000 if y<50 else (1900 if y<100 else 0)
-            return (y, mon, max(1,min(d,31)))
-    m = re.match(r"^\s*([a-zåäö\.]+)\s*(\d{2,4})?\s*$", t)
-    if m:
-        mon_txt,y = m.groups(); mon=_MONTHS.get(mon_txt.rstrip("."), None)
-        if mon:
-            if y is None: y = date.today().year
-            else:
-                y=int(y); y += 2000 if y<50 else (1900 if y<100 else 0)
-            return (y, mon, 1)
-    return (9999, 12, 31)
+from event_store import EventStore, FilteredView
+from ui.virtual_list import VirtualList
+from storage import normalize_event
 
 
 class EventsPanel(ttk.Frame):
@@ -49,15 +13,15 @@ class EventsPanel(ttk.Frame):
     CRUD + sortering + SÖK. Flera personer per event.
     Fält: title, date, characters[], activity, location, image
     """
-    def __init__(self, master, get_characters, get_locations, on_change, on_filter=None):
+    def __init__(self, master, get_characters, get_locations, on_change, on_filter=None, on_record=None):
         super().__init__(master)
         self.get_characters = get_characters
         self.get_locations = get_locations
         self.on_change = on_change
         self.on_filter = on_filter
-        self._events: list[dict] = []
-        self._filtered: list[dict] = []
-        self._index_map: list[int] = []
+        self.on_record = on_record  # optional: func(op, old, new) för journalen
+        self._store = EventStore()  # alltid datumsorterad, med sökindex
+        self._view = FilteredView()  # senaste filterresultatet, ny version vid varje ändring
 
         ttk.Label(self, text="Events", font=("TkDefaultFont", 11, "bold")).pack(pady=(4,2))
 
@@ -108,10 +72,9 @@ class EventsPanel(ttk.Frame):
         ttk.Button(btns, text="Update", command=self.update_event).pack(side="left", padx=2)
         ttk.Button(btns, text="Delete", command=self.delete_event).pack(side="left", padx=2)
 
-        # List
-        self.listbox = tk.Listbox(self, height=12)
+        # List (virtualiserad: bara synliga rader formateras)
+        self.listbox = VirtualList(self, height=12, on_select=self.fill_form)
         self.listbox.pack(fill="both", expand=True, pady=4)
-        self.listbox.bind("<<ListboxSelect>>", self.fill_form)
 
     # Behaviors 
     def _toggle_on_click(self, event):
@@ -130,69 +93,72 @@ class EventsPanel(ttk.Frame):
             self.char_list.insert(tk.END, name)
         self.loc_cb["values"] = self.get_locations()
 
-    def data(self): return self._events
-    def filtered_data(self): return list(self._filtered)
+    def data(self): return self._store.events
+    def filtered_view(self) -> FilteredView:
+        """Filtrerade events i datumordning, utan kopiering. Jämför .version för att se ändringar."""
+        return self._view
+
+    def filtered_ordinals(self) -> list[int]:
+        """Datum-ordinal för varje filtrerat event (dates.UNKNOWN om okänt). Ändra inte listan."""
+        return self._view.ords
 
     def filtered_index_to_data_index(self, i: int) -> int | None:
-        return self._index_map[i] if 0 <= i < len(self._index_map) else None
+        return self._view.data_index(i)
 
     def set_search(self, text: str):
         self.search_var.set(text or "")
         self._filter_changed()
 
+    def narrow_to_dates(self, lo: date, hi: date):
+        """Byt date:-villkoret i sökfältet mot [lo, hi] (t.ex. klick på en hink i timelinen)."""
+        rest = re.sub(r"\bdate:\S*", "", self.search_var.get()).strip()
+        self.set_search(f"{rest} date:{lo.isoformat()}..{hi.isoformat()}".strip())
+
+    def keys_with_any_character(self, names) -> set[int]:
+        """id(ev) för events med någon av karaktärerna (ur karaktärsindexet)."""
+        return self._store.keys_with_any_character(names)
+
     def events_for_character(self, name: str) -> list[dict]:
-        return [ev for ev in self._events if name in (ev.get("characters") or [])]
+        """Events där karaktären är med, i datumordning (ur karaktärsindexet)."""
+        return self._store.with_character(name)
 
     def set_data(self, items: list[dict]):
-        normalized = []
-        for ev in items or []:
-            ev = dict(ev)
-            if "characters" not in ev:
-                ch = ev.get("character","").strip()
-                ev["characters"] = [ch] if ch else []
-            else:
-                ev["characters"] = [s for s in (ev.get("characters") or []) if str(s).strip()]
-            ev["activity"] = ev.get("activity","").strip()
-            ev["location"] = ev.get("location","").strip()
-            ev["image"] = (ev.get("image","") or "").strip()
-            ev.pop("character", None)
-            normalized.append(ev)
-        self._events = normalized
-        self._sort(); self._apply_filter()
+        store = self.begin_load()
+        store.extend([normalize_event(dict(ev)) for ev in items or []])
+        self.end_load(store)
+
+    # inkrementell laddning (storage.iter_project): bitarna läggs i en egen
+    # EventStore (extend), panelen visar den gamla tills end_load byter in den
+    def begin_load(self) -> EventStore:
+        return EventStore()
+
+    def end_load(self, store: EventStore):
+        store.finish_load()
+        self._store = store
+        self._apply_filter()
         if self.on_filter: self.on_filter()
 
     # sort/filter
-    def _sort(self): self._events.sort(key=lambda ev: _parse_date_str(ev.get("date","")))
     def _clear_search(self): self.search_var.set(""); self._filter_changed()
     def _filter_changed(self): self._apply_filter();  self.on_filter and self.on_filter()
 
     def _apply_filter(self):
-        self._sort()
+        # ingen sortering här: _store är alltid datumsorterad. Frågan kan ha
+        # fält (char:, loc:, date:), se query.py; svaret kommer ur indexen.
         q = self.search_var.get().strip().lower()
-
-        def match(ev):
-            if not q: return True
-            chars = ", ".join(ev.get("characters", []))
-            hay = " ".join([ev.get("Event",""), ev.get("date",""),
-                            ev.get("activity",""), chars, ev.get("location",""),
-                            ev.get("image","")]).lower()
-            return q in hay
-
-        self._filtered, self._index_map = [], []
-        for i, ev in enumerate(self._events):
-            if match(ev):
-                self._filtered.append(ev); self._index_map.append(i)
-
-        self.listbox.delete(0, tk.END)
-        for ev in self._filtered:
-            chars = ", ".join(ev.get("characters", []))
-            lo = ev.get("location","")
-            act = ev.get("activity","")
-            label = f'{ev.get("date","")}: {ev.get("title","")}'
-            if act: label += f' – {act}'
-            label += f' ({chars}/{lo})'
-            if ev.get("image"): label += " [🖼]"
-            self.listbox.insert(tk.END, label)
+        self._view = FilteredView(*self._store.filter(q), version=self._view.version + 1)
+        self.listbox.set_rows(len(self._view), self._row_label)
+
+    def _row_label(self, i: int) -> str:
+        ev = self._view[i]
+        chars = ", ".join(ev.get("characters", []))
+        lo = ev.get("location","")
+        act = ev.get("activity","")
+        label = f'{ev.get("date","")}: {ev.get("title","")}'
+        if act: label += f' – {act}'
+        label += f' ({chars}/{lo})'
+        if ev.get("image"): label += " [🖼]"
+        return label
 
     # CRUD
     def _selected_chars_from_form(self) -> list[str]:
@@ -201,20 +167,22 @@ class EventsPanel(ttk.Frame):
     def add_event(self):
         t = self.title_var.get().strip()
         if not t: return
-        self._events.append({
+        ev = {
             "Event": t,
             "date": self.date_var.get().strip(),
             "characters": self._selected_chars_from_form(),
             "activity": self.activity_var.get().strip(),
             "location": self.loc_var.get().strip(),
             "image": self.image_var.get().strip(),
-        })
+        }
+        self._store.insert(ev)
+        self._record("add", None, ev)
         self.refresh(); self.clear_form()
 
     def update_event(self):
         idx = self.filtered_index_to_data_index(self._selected_index())
         if idx is None: return
-        self._events[idx] = {
+        new = {
             "Event": self.title_var.get().strip(),
             "date": self.date_var.get().strip(),
             "characters": self._selected_chars_from_form(),
@@ -222,14 +190,20 @@ class EventsPanel(ttk.Frame):
             "location": self.loc_var.get().strip(),
             "image": self.image_var.get().strip(),
         }
+        old, _ = self._store.replace(idx, new)
+        self._record("update", old, new)
         self.refresh()
 
     def delete_event(self):
         idx = self.filtered_index_to_data_index(self._selected_index())
         if idx is None: return
-        del self._events[idx]
+        old = self._store.pop(idx)
+        self._record("delete", old, None)
         self.refresh(); self.clear_form()
 
+    def _record(self, op: str, old, new):
+        if self.on_record: self.on_record(op, old, new)
+
     def refresh(self):
         self._apply_filter()
         self.on_change()
@@ -242,7 +216,7 @@ class EventsPanel(ttk.Frame):
     def fill_form(self, *_):
         i = self._selected_index()
         if i is None: return
-        ev = self._filtered[i]
+        ev = self._view[i]
         self.title_var.set(ev.get("Event",""))
         self.date_var.set(ev.get("date",""))
         self.activity_var.set(ev.get("activity",""))
@@ -272,5 +246,10 @@ class EventsPanel(ttk.Frame):
     def set_event_date_by_filtered_index(self, filtered_idx: int, new_date_str: str):
         di = self.filtered_index_to_data_index(filtered_idx)
         if di is None: return
-        self._events[di]["date"] = (new_date_str or "").strip()
+        # ersätt posten i stället för att ändra den på plats (sparning i bakgrunden
+        # jobbar mot en ögonblicksbild av samma dicts)
+        old = self._store.events[di]
+        new = dict(old, date=(new_date_str or "").strip())
+        self._store.replace(di, new)   # flyttas till rätt plats med bisect
+        self._record("update", old, new)
         self.refresh()
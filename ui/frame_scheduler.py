@@ -0,0 +1,50 @@
+# ui/frame_scheduler.py
+import time
+
+
+class FrameScheduler:
+    """
+    Single-flight-schemaläggare för omritning: request() markerar vyn som
+    ogiltig och render() körs högst en gång per idle-cykel (after_idle), och
+    med budget_ms > 0 högst en gång per budget_ms. Anrop som kommer medan en
+    frame redan väntar räknas som sammanslagna (coalesced).
+    """
+    def __init__(self, widget, render, budget_ms: int = 0):
+        self.widget = widget
+        self.render = render              # render() -> None, körs på UI-tråden
+        self.budget_ms = budget_ms
+        self._job = None
+        self._last = 0.0                  # perf_counter när förra frame startade
+        self.requested = 0
+        self.rendered = 0
+        self.coalesced = 0
+        self.last_ms = 0.0                # tid för senaste render()
+
+    def request(self):
+        self.requested += 1
+        if self._job is not None:
+            self.coalesced += 1
+            return
+        wait = self.budget_ms - (time.perf_counter() - self._last) * 1000
+        if wait > 0:
+            self._job = self.widget.after(int(wait) + 1, self._run)
+        else:
+            self._job = self.widget.after_idle(self._run)
+
+    def cancel(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def _run(self):
+        self._job = None
+        self._last = time.perf_counter()
+        try:
+            self.render()
+        finally:
+            self.rendered += 1
+            self.last_ms = (time.perf_counter() - self._last) * 1000
+
+    def stats(self) -> str:
+        return (f"{self.rendered} frames / {self.requested} requests "
+                f"({self.coalesced} coalesced), last {self.last_ms:.1f} ms")
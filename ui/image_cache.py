@@ -0,0 +1,271 @@
+# ui/image_cache.py
+"""
+Gemensam bildcache för timelinen, detaljdialogen och CrudPanels preview.
+
+Nyckeln är (sökväg, mtime, filstorlek, box): en fil som ändrats på disk får
+en ny nyckel och laddas om, den gamla posten åldras ut ur LRU:n. Budgeten
+räknas i byte (bredd * höjd * 4 per PhotoImage). stat() cachas STAT_TTL
+sekunder så att en omritning inte gör ett syscall per event.
+
+fetch() avkodar i en trådpool (bara PIL, Tk får inte röras utanför UI-tråden):
+resultaten hämtas från en kö som pollas med after(), PhotoImage skapas på
+UI-tråden och done(img) anropas. Samma bild avkodas bara en gång även om
+flera väntar; cancel() släpper en beställning som inte längre behövs.
+
+Med en ThumbStore (thumb_store.py) läses små miniatyrer från disk i stället
+för att originalet avkodas, och nya sparas dit.
+"""
+import math
+import os
+import queue
+import stat
+import time
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from thumb_store import ThumbStore
+
+try:
+    from PIL import Image, ImageTk
+    PIL_OK = True
+except Exception:
+    PIL_OK = False
+
+BUDGET_BYTES = 64 * 1024 * 1024
+STAT_TTL = 2.0            # sekunder som ett stat()-resultat gäller
+STAT_MAX = 4096           # rensa utgångna stat-poster när cachen blivit så stor
+FAILED_COST = 64          # "storlek" för en fil som inte gick att läsa (cachas som None)
+DECODE_WORKERS = 4
+POLL_MS = 15
+
+
+def file_sig(path: str) -> tuple[int, int] | None:
+    """(mtime_ns, storlek) för en vanlig fil, annars None."""
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def decode(path: str, box: tuple[int, int]):
+    """PIL-bild nedskalad till box (bevarar proportionerna). Trådsäker, rör inte Tk."""
+    im = Image.open(path)
+    # JPEG: libjpeg skalar ned redan vid avkodningen (1/2, 1/4, 1/8) till minst box.
+    # thumbnail() gör själv draft till 2x box; draft till box är det som vinner tid
+    # (märks vid dialogens stora bild). Övriga format ignorerar draft.
+    im.draft("RGB", box)
+    im.thumbnail(box)
+    return im
+
+
+def load_photo(path: str, box: tuple[int, int]) -> tk.PhotoImage:
+    """Avkoda och skala ned till box. Körs på UI-tråden."""
+    if PIL_OK:
+        return ImageTk.PhotoImage(decode(path, box))
+    img = tk.PhotoImage(file=path)
+    k = math.ceil(max(img.width() / box[0], img.height() / box[1]))
+    return img.subsample(k) if k > 1 else img
+
+
+class ImageCache:
+    def __init__(self, widget=None, budget_bytes: int = BUDGET_BYTES, stat_ttl: float = STAT_TTL):
+        self.widget = widget              # för after(); utan widget (eller PIL) laddar fetch() direkt
+        self.budget_bytes = budget_bytes
+        self.stat_ttl = stat_ttl
+        self._lru: OrderedDict[tuple, tuple[tk.PhotoImage | None, int]] = OrderedDict()
+        self._stat: dict[str, tuple[float, tuple[int, int] | None]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.cancelled = 0
+        # avkodning i bakgrunden
+        self._pool: ThreadPoolExecutor | None = None
+        self._results: queue.Queue = queue.Queue()
+        self._futures: dict[tuple, object] = {}          # nyckel -> Future
+        self._outstanding = 0                            # avkodningar vars resultat inte hämtats (även avbeställda)
+        self._waiters: dict[tuple, dict[int, object]] = {}   # nyckel -> {ticket: done}
+        self._ticket_key: dict[int, tuple] = {}
+        self._next_ticket = 0
+        self._polling = False
+        self.store: ThumbStore | None = None   # miniatyrer på disk för aktuellt projekt
+
+    def __len__(self):
+        return len(self._lru)
+
+    def sig(self, path: str) -> tuple[int, int] | None:
+        """file_sig() med kort cache; None = saknas eller inte en fil."""
+        now = time.monotonic()
+        hit = self._stat.get(path)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        if len(self._stat) >= STAT_MAX:
+            self._stat = {p: v for p, v in self._stat.items() if v[0] > now}
+        s = file_sig(path)
+        self._stat[path] = (now + self.stat_ttl, s)
+        return s
+
+    def exists(self, path: str) -> bool:
+        p = (path or "").strip()
+        return bool(p) and self.sig(p) is not None
+
+    def _key(self, path: str, box) -> tuple | None:
+        p = (path or "").strip()
+        if not p:
+            return None
+        s = self.sig(p)
+        return None if s is None else (p, s[0], s[1], tuple(box))
+
+    def _hit(self, key: tuple):
+        hit = self._lru.get(key)
+        if hit is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+        return hit
+
+    def get(self, path: str, box: tuple[int, int]) -> tk.PhotoImage | None:
+        """Synkront: avkodar direkt vid miss."""
+        key = self._key(path, box)
+        if key is None:
+            return None
+        hit = self._hit(key)
+        if hit is not None:
+            return hit[0]
+        self.misses += 1
+        try:
+            img = ImageTk.PhotoImage(self._decode(key)) if PIL_OK else load_photo(key[0], box)
+            cost = img.width() * img.height() * 4
+        except Exception:
+            img, cost = None, FAILED_COST         # trasig fil: försök inte igen förrän den ändras
+        self._put(key, img, cost)
+        return img
+
+    def _put(self, key: tuple, img, cost: int):
+        old = self._lru.pop(key, None)          # kan avkodas två gånger om den avbeställts under tiden
+        if old is not None:
+            self.bytes -= old[1]
+        self._lru[key] = (img, cost)
+        self.bytes += cost
+        # PhotoImages som fortfarande visas lever kvar via widgetens referens
+        while self.bytes > self.budget_bytes and len(self._lru) > 1:
+            _, (_, c) = self._lru.popitem(last=False)
+            self.bytes -= c
+            self.evictions += 1
+
+    def fetch(self, path: str, box: tuple[int, int], done) -> tuple[tk.PhotoImage | None, int | None]:
+        """
+        (bild, None) om bilden finns i cachen eller inte finns alls (bild = None).
+        Annars (None, ticket): avkodningen är beställd och done(img) anropas på
+        UI-tråden när den är klar, om den inte avbeställts med cancel(ticket).
+        """
+        key = self._key(path, box)
+        if key is None:
+            return None, None
+        hit = self._hit(key)
+        if hit is not None:
+            return hit[0], None
+        if not PIL_OK or self.widget is None:
+            return self.get(path, box), None
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            self.misses += 1
+            waiters = self._waiters[key] = {}
+            self._futures[key] = self._submit(self._decode_job, key)
+            self._outstanding += 1
+        self._next_ticket += 1
+        t = self._next_ticket
+        waiters[t] = done
+        self._ticket_key[t] = key
+        if not self._polling:
+            self._polling = True
+            self.widget.after(POLL_MS, self._poll)
+        return None, t
+
+    def cancel(self, ticket: int | None):
+        key = self._ticket_key.pop(ticket, None)
+        if key is None:
+            return
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            return          # resultatet delas redan ut (_poll), t.ex. när en done() avbeställer ett syskon
+        waiters.pop(ticket, None)
+        if not waiters:
+            # ingen väntar längre: stryk jobbet om det inte redan börjat
+            del self._waiters[key]
+            fut = self._futures.pop(key, None)
+            if fut is not None and fut.cancel():
+                self.cancelled += 1
+                self._outstanding -= 1     # körs aldrig; ett jobb som redan kör lämnar ändå ett resultat
+
+    def _submit(self, fn, *args):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+        return self._pool.submit(fn, *args)
+
+    def _decode(self, key: tuple):
+        # PIL-bild för key: från disk-cachen om den finns där, annars avkodad (och sparad)
+        p, mtime, size, box = key
+        store = self.store
+        if store is None or not store.wants(box):
+            return decode(p, box)
+        im = store.load(p, (mtime, size), box)
+        if im is None:
+            im = decode(p, box)
+            store.save(p, (mtime, size), box, im)
+        return im
+
+    def _decode_job(self, key: tuple):
+        # arbetstråd
+        try:
+            im = self._decode(key)
+        except Exception:
+            im = None
+        self._results.put((key, im))
+
+    def _poll(self):
+        while True:
+            try:
+                key, im = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            self._futures.pop(key, None)
+            waiters = self._waiters.pop(key, {})
+            try:
+                img = ImageTk.PhotoImage(im) if im is not None else None
+                cost = img.width() * img.height() * 4 if img is not None else FAILED_COST
+            except Exception:
+                img, cost = None, FAILED_COST
+            self._put(key, img, cost)      # sparas även om ingen väntar längre
+            for t, done in waiters.items():
+                if self._ticket_key.pop(t, None) is not None:   # inte avbeställd av en tidigare done()
+                    done(img)
+        if self._outstanding:
+            self.widget.after(POLL_MS, self._poll)   # även avbeställda som redan kör: kön ska tömmas
+        else:
+            self._polling = False
+
+    def set_store(self, store: ThumbStore | None, paths=()):
+        """Byt disk-cache (nytt projekt). paths: bilderna projektet använder; övriga rensas i bakgrunden."""
+        self.store = store
+        if store is not None and PIL_OK:
+            self._submit(self._prune_job, store, list(paths))
+
+    @staticmethod
+    def _prune_job(store: ThumbStore, paths: list[str]):
+        # arbetstråd
+        store.prune((p, s) for p in paths if (s := file_sig(p)) is not None)
+
+    def clear(self):
+        """Glöm bilder och stat-resultat (nytt projekt), så att ändrade filer syns direkt."""
+        self._lru.clear(); self._stat.clear()
+        self.bytes = 0
+
+    def stats(self) -> str:
+        return (f"{len(self._lru)} images, {self.bytes / 1048576:.1f} MB, "
+                f"{self.hits} hits / {self.misses} misses, {self.evictions} evicted, "
+                f"{self.cancelled} cancelled")
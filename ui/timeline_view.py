@@ -1,21 +1,34 @@
-import re
+import math
 import tkinter as tk
 from tkinter import ttk, messagebox, Toplevel
+from tkinter import font as tkfont
+from bisect import bisect_left, bisect_right
 from datetime import date
-from pathlib import Path
+from itertools import islice
+from operator import attrgetter, itemgetter
 
-# Pillow (behövs för JPG/WEBP)
-try:
-    from PIL import Image, ImageTk
-    PIL_OK = True
-except Exception:
-    PIL_OK = False
+from dates import UNKNOWN, format_date_dmy
+from timeline_axis import Axis, calendar_ticks, slot_ticks
+from timeline_lod import BucketIndex
+from ui.frame_scheduler import FrameScheduler
+from ui.image_cache import ImageCache
 
 # Paletter
 PALETTE_CHAR = ["#3d9cd6", "#A7F3D0", "#CD5699", "#B76BE0", "#2047E6",
                 "#A20909", "#5691D4", "#D8B4FE", "#FDBA74", "#86EFAC"]
 PALETTE_LOC  = ["#334155", "#3f6212", "#155e75", "#7c2d12", "#da7adf",
                 "#5e93dc", "#14532d", "#4572db", "#713f12", "#54d88b"]
+# hur långt utanför canvasen (px) som fortfarande ritas: titlar/miniatyrer sticker ut
+CULL_MARGIN = 200
+# miniatyrer som förhämtas strax utanför bild i panoreringsriktningen
+PREFETCH_PX = 600
+PREFETCH_MAX = 64
+HOVER_DELAY_MS = 300
+
+_anchor = attrgetter("anchor")
+_tick_x = itemgetter(0)
+_ignore = lambda img: None
+
 _char_color_map: dict[str, str] = {}
 _loc_color_map: dict[str, str] = {}
 
@@ -29,88 +42,73 @@ def color_for_location(name: str) -> str:
         _loc_color_map[name] = PALETTE_LOC[len(_loc_color_map) % len(PALETTE_LOC)]
     return _loc_color_map[name]
 
-# date 
-_MONTHS = {
-    "jan":1,"januari":1,"feb":2,"februari":2,"mar":3,"mars":3,"march":3,
-    "apr":4,"april":4,"maj":5,"may":5,"jun":6,"juni":6,"june":6,
-    "jul":7,"juli":7,"july":7,"aug":8,"augusti":8,"august":8,
-    "sep":9,"sept":9,"september":9,"okt":10,"oktober":10,"oct":10,"october":10,
-    "nov":11,"november":11,"dec":12,"december":12,
-}
-
-def _parse_date_str(s: str) -> date | None:
-    if not s: return None
-    t = s.strip().lower()
-    m = re.match(r"^\s*(\d{4})[\/\-. ](\d{1,2})[\/\-. ](\d{1,2})\s*$", t)
-    if m:
-        y, mo, d = map(int, m.groups())
-        return date(y, max(1, min(mo, 12)), max(1, min(d, 31)))
-    m = re.match(r"^\s*(\d{1,2})[\/\-. ](\d{1,2})(?:[\/\-. ](\d{2,4}))?\s*$", t)
-    if m:
-        d, mo, y = m.groups()
-        d = int(d); mo = int(mo)
-        if y is None: y = date.today().year
-        else:
-            y = int(y); y += 2000 if y < 50 else (1900 if y < 100 else 0)
-        return date(y, max(1, min(mo, 12)), max(1, min(d, 31)))
-    m = re.match(r"^\s*(\d{1,2})\s+([a-zåäö\.]+)\s*(\d{2,4})?\s*$", t)
-    if m:
-        d, mon_txt, y = m.groups()
-        mon = _MONTHS.get(mon_txt.rstrip("."))
-        if mon:
-            d = int(d)
-            if y is None: y = date.today().year
-            else:
-                y = int(y); y += 2000 if y < 50 else (1900 if y < 100 else 0)
-            return date(y, mon, max(1, min(d, 31)))
-    m = re.match(r"^\s*([a-zåäö\.]+)\s*(\d{2,4})?\s*$", t)
-    if m:
-        mon_txt, y = m.groups()
-        mon = _MONTHS.get(mon_txt.rstrip("."))
-        if mon:
-            if y is None: y = date.today().year
-            else:
-                y = int(y); y += 2000 if y < 50 else (1900 if y < 100 else 0)
-            return date(y, mon, 1)
-    return None
-
-def _format_date_dmy(d: date) -> str:
-    return f"{d.day}/{d.month}/{d.year}"
-
 
 class TimelineView(ttk.Frame):
     """Timeline med zoom/pan/drag, miniatyrer och detaljer med char+location-bilder."""
-    def __init__(self, master, get_characters, get_locations, events_panel):
+    def __init__(self, master, get_characters, get_locations, events_panel, characters, locations,
+                 images: ImageCache):
         super().__init__(master, padding=10)
         self.get_characters = get_characters
         self.get_locations  = get_locations 
         self.events_panel   = events_panel
-
-        ttk.Label(self, text="Timeline (zoom, pan, drag; dbl-klick för detaljer)",
-                  font=("TkDefaultFont", 11, "bold")).pack(anchor="w")
+        self.characters     = characters    # EntityRegistry: namn -> karaktär
+        self.locations      = locations     # EntityRegistry: namn -> plats
+        self.images         = images        # delad bildcache (även CrudPanel)
+
+        head = ttk.Frame(self); head.pack(fill="x")
+        ttk.Label(head, text="Timeline (zoom, pan, drag; dbl-klick för detaljer)",
+                  font=("TkDefaultFont", 11, "bold")).pack(side="left")
+        # proportionell tidsaxel: x efter datum i stället för en slot per unikt datum
+        self.proportional = tk.BooleanVar(value=False)
+        ttk.Checkbutton(head, text="Proportional time axis", variable=self.proportional,
+                        command=self.redraw).pack(side="right")
         self.canvas = tk.Canvas(self, bg="#fafafa", highlightthickness=0)
         self.canvas.pack(fill="both", expand=True, pady=(6, 0))
 
         # state
         self.scale = 1.0
-        self._axis_dates: list[date] = []
-        self._axis_start_x = 0.0
-        self._axis_step = 100.0
-        self._single_x = 0.0
+        self._axis = Axis()               # unika datum (ordinal) <-> x
+        self._axis_version = -1           # filtrerad vy som _axis byggdes ur
         self._margin = 80
+        self._ticks_key = None            # (vy-version, bredd, proportionell) för _ticks
+        self._ticks: list[tuple[float, str]] = []   # (x relativt axelns start, etikett)
 
         self._legend_char_tags: dict[str, str] = {}
+        self._legend_imgs: list = []
+        self._legend_key = None           # (karaktärer, platser, highlight) som legenden ritades för
+        self._legend_fonts = (tkfont.Font(font=("TkDefaultFont", 9)),
+                              tkfont.Font(font=("TkDefaultFont", 9, "bold")))
         self.highlight_names: set[str] = set()
         self._pan = 0.0
         self._pan_dragging = False
         self._pan_last_x = 0
         self._drag_ev_index: int | None = None
         self._drag_marker = None
-        self._thumb_cache: dict[str, tk.PhotoImage] = {}
-
-        # hover tooltip
-        self._hover: Toplevel | None = None
-        self._hover_img = None
+        self._drawn = (0, -1)             # slots (index i _axis.ords) som har canvas-objekt
+        self._slot_imgs: dict[int, list] = {}   # bildreferenser per ritad slot
+        self._slot_jobs: dict[int, list] = {}   # beställda miniatyrer per ritad slot (avbeställs när den försvinner)
+        self._legend_jobs: list = []
+        self._prefetched: dict[str, int] = {}   # sökväg -> ticket för förhämtade miniatyrer
+        self._base_y = 0
+        self._lod: BucketIndex | None = None     # hinkar för aktuell filtrerad vy
+        self._level: str | None = None           # None = enskilda events
+        self._max_stack = 1                      # events per dag som får plats på höjden
+        self._expanded_days: set[int] = set()    # dagar (ordinal) som visas trots att de inte får plats
+
+        # omritning samlas till högst en frame per idle-cykel / 16 ms
+        self.frames = FrameScheduler(self, self._render_frame, budget_ms=16)
+        # en väntande frame får inte köras mot en förstörd canvas
+        self.bind("<Destroy>", lambda e: e.widget is self and self.frames.cancel(), add="+")
+        self._full = False                # full redraw väntar
+        self._pending_dx = 0.0            # pan som inte ritats än
+        self._pending_zoom = 1.0          # zoomfaktor som inte ritats än
+
+        # hover tooltip (skapas vid första hover, göms sedan i stället för att förstöras)
+        self._tip: Toplevel | None = None
+        self._tip_text = None
+        self._tip_img = None
+        self._tip_ticket = None
+        self._hover_job = None
 
         # binds
         self.canvas.bind("<Configure>",  lambda e: self.redraw())
@@ -135,247 +133,435 @@ class TimelineView(ttk.Frame):
         self.canvas.tag_bind("event", "<Leave>", self._event_hover_out)
         # legend
         self.canvas.tag_bind("legend_char", "<Button-1>", self.on_legend_char_click)
+        # hinkar (level of detail)
+        self.canvas.tag_bind("bucket", "<Button-1>", self._on_bucket_click)
 
-    def _get_thumb(self, path: str, max_wh=(40, 40)) -> tk.PhotoImage | None:
-        p = (path or "").strip()
-        if not p or not Path(p).exists():
-            return None
-        key = f"{Path(p).resolve()}|{max_wh[0]}x{max_wh[1]}"
-        if key in self._thumb_cache:
-            return self._thumb_cache[key]
-        try:
-            if PIL_OK:
-                im = Image.open(p)
-                im.thumbnail(max_wh)
-                img = ImageTk.PhotoImage(im)
-            else:
-                img = tk.PhotoImage(file=p) 
-            self._thumb_cache[key] = img
-            return img
-        except Exception:
-            return None
-
-    def _make_img(self, path: str, max_wh=(520, 520)) -> tk.PhotoImage | None:
-        """Ladda bild för dialogens huvudbild."""
-        p = (path or "").strip()
-        if not p or not Path(p).exists():
-            return None
-        try:
-            if PIL_OK:
-                im = Image.open(p)
-                im.thumbnail(max_wh)
-                return ImageTk.PhotoImage(im)
-            else:
-                return tk.PhotoImage(file=p) 
-        except Exception:
-            return None
+    def _thumb_path(self, ev: dict) -> str:
+        """Första bilden som finns: event -> första karaktär -> plats."""
+        chars = ev.get("characters") or []
+        for p in (ev.get("image", ""),
+                  self._char_image(chars[0]) if chars else None,
+                  self._loc_image(ev.get("location", "")) if ev.get("location") else None):
+            if p and self.images.exists(p):
+                return p.strip()
+        return ""
 
     def _char_image(self, name: str) -> str | None:
-        for ci in self.get_characters():
-            if ci.get("name", "") == name:
-                p = (ci.get("image", "") or "").strip()
-                return p if p else None
-        return None
+        return self.characters.image(name)
 
     def _loc_image(self, name: str) -> str | None:
-        for li in self.get_locations():
-            if li.get("name", "") == name:
-                p = (li.get("image", "") or "").strip()
-                return p if p else None
-        return None
+        return self.locations.image(name)
 
     # ---------- redraw ----------
+    # Events ritas per axel-slot och taggas "scene" + e{j}. Pan flyttar scenen
+    # (canvas.move) och zoom skalar varje slots events runt sin axelpunkt
+    # (canvas.scale); sedan ritas/tas bara slots vid kanterna bort. De få
+    # synliga ticks ritas om varje frame. Baslinje och legend ligger fast.
+    # Full redraw bara när data/storlek ändras.
+    # Allt går via self.frames, så flera anrop per användarhandling blir en frame.
     def redraw(self):
+        """Begär en full omritning (sker i nästa frame)."""
+        self._full = True
+        self.frames.request()
+
+    def _render_frame(self):
+        if self._full:
+            self._full = False
+            self._pending_dx, self._pending_zoom = 0.0, 1.0   # redan med i _pan/scale
+            self._redraw_now()
+            return
+        dx, f = self._pending_dx, self._pending_zoom
+        self._pending_dx, self._pending_zoom = 0.0, 1.0
+        if dx:
+            self._axis.shift(dx)
+            self.canvas.move("scene", dx, 0)
+        if f != 1.0:
+            lo, hi = self._drawn
+            for j in range(lo, hi + 1):
+                self.canvas.scale(f"e{j}", self._axis.slot_x(j), self._base_y, f, f)
+        if dx:
+            self._update_slots()
+            self._draw_ticks()
+            self._prefetch(dx)
+
+    def _redraw_now(self):
         c = self.canvas
         if not c.winfo_ismapped(): return
-        c.delete("all")
-        c._img_refs = []  
+        c.delete("scene", "tick", "baseline")       # legenden ligger kvar (eget lager)
+        self._slot_imgs.clear()
+        for tickets in self._slot_jobs.values():
+            for t in tickets: self.images.cancel(t)
+        self._slot_jobs.clear()
+        self._drawn = (0, -1)
         w, h = c.winfo_width(), c.winfo_height()
-        y = h // 2
+        self._base_y = h // 2
 
         self._build_axis(w)
+        self._choose_lod()
 
         # baslinje
         x0, x1 = self._margin, w - self._margin
-        c.create_line(x0, y, x1, y, width=2, fill="#444")
-
-        # ticks
-        if len(self._axis_dates) == 1:
-            d = self._axis_dates[0]
-            c.create_line(self._single_x, y-8, self._single_x, y+8, fill="#777")
-            c.create_text(self._single_x, y-24, text=_format_date_dmy(d),
-                          font=("TkDefaultFont", 9, "bold"))
-        else:
-            for i, d in enumerate(self._axis_dates):
-                xx = self._axis_start_x + i * self._axis_step
-                c.create_line(xx, y-8, xx, y+8, fill="#777")
-                c.create_text(xx, y-24, text=_format_date_dmy(d),
-                              font=("TkDefaultFont", 9, "bold"))
-
-        # events
-        radius = int(12 * self.scale)
-        per_day_counter: dict[date, int] = {}
-        gap_y = max(8, int(6 * self.scale))
-
-        for i, ev in enumerate(self.events_panel.filtered_data()):
-            d = _parse_date_str(ev.get("date", ""))
-            if not d: continue
-            x = self._date_to_x(d)
-
-            k = per_day_counter.get(d, 0)
-            per_day_counter[d] = k + 1
-            y0 = y + (k * (2 * radius + gap_y))
-
-            chars = ev.get("characters") or []
-            first_char = chars[0] if chars else ""
-            loc = ev.get("location", "")
-
-            # färger
-            fill = color_for_character(first_char)
-            outline = color_for_location(loc)
-            tags = ("event", f"event_{i}")
-
-            # highlight
-            is_hit = (not self.highlight_names) or bool(self.highlight_names.intersection(chars))
-            if not is_hit:
-                fill = "#dddddd"; outline = "#cccccc"
-
-            c.create_oval(x - radius, y0 - radius, x + radius, y0 + radius,
-                fill=fill, outline=outline, width=3, tags=tags)
-
-            txt_color = "#000" if is_hit else "#999"
-            c.create_text(x, y0 - radius - 2, text=ev.get("title", ""),
-                          fill=txt_color, font=("TkDefaultFont", 9), tags=tags)
-            act = ev.get("activity", "")
-            if act:
-                c.create_text(x, y0 - radius + 12, text=act,
-                              fill=txt_color, font=("TkDefaultFont", 8), tags=tags)
-
-            # thumbnail: event -> char -> loc
-            th = self._get_thumb(ev.get("image", ""))
-            if th is None and first_char:
-                th = self._get_thumb(self._char_image(first_char) or "")
-            if th is None and loc:
-                th = self._get_thumb(self._loc_image(loc) or "")
-            if th is not None:
-                c.create_image(x + radius + 10, y0, image=th, anchor="w", tags=tags)
-                c._img_refs.append(th)
-
-            # badges för karaktärer
-            if chars:
-                br = max(4, int(5 * self.scale)); gap = 2
-                total = len(chars) * (2 * br) + (len(chars) - 1) * gap
-                start = x - total / 2 + br
-                badge_y = y0 + radius + 8
-                for k2, nm in enumerate(chars):
-                    bx = start + k2 * (2 * br + gap)
-                    bfill = color_for_character(nm) if is_hit else "#e5e7eb"
-                    c.create_oval(bx - br, badge_y - br, bx + br, badge_y + br,
-                                  fill=bfill, outline="#222", width=1, tags=tags)
+        c.create_line(x0, self._base_y, x1, self._base_y, width=2, fill="#444", tags=("baseline",))
 
         self._draw_legend(c)
+        self._update_slots()
+        self._draw_ticks()
 
-    # zoom
+    def _update_slots(self):
+        """Rita slots som kommit in i bild och ta bort de som lämnat den."""
+        c = self.canvas
+        lo, hi = self._drawn
+        nlo, nhi = self._axis.visible_slots(-CULL_MARGIN, c.winfo_width() + CULL_MARGIN)
+        if nlo > nhi or hi < nlo or nhi < lo:       # inget överlapp
+            for j in range(lo, hi + 1): self._drop_slot(j)
+            self._draw_slots(nlo, nhi)
+        else:
+            for j in range(lo, nlo):      self._drop_slot(j)
+            for j in range(nhi + 1, hi + 1): self._drop_slot(j)
+            self._draw_slots(nlo, lo - 1)
+            self._draw_slots(hi + 1, nhi)
+        self._drawn = (nlo, nhi)
+        c.tag_raise("legend_bg"); c.tag_raise("legend")   # legenden ligger överst
+
+    def _drop_slot(self, j: int):
+        self.canvas.delete(f"e{j}")
+        self._slot_imgs.pop(j, None)
+        for t in self._slot_jobs.pop(j, ()):
+            self.images.cancel(t)
+
+    def _draw_slots(self, a: int, b: int):
+        """Rita ticks och events (eller hinkar) för slots a..b (inklusive)."""
+        if a > b: return
+        c, y, axis = self.canvas, self._base_y, self._axis.ords
+
+        # filtrerat och datumsorterat av panelen; highlight slås upp i karaktärsindexet
+        view = self.events_panel.filtered_view()
+        hit_keys = (self.events_panel.keys_with_any_character(self.highlight_names)
+                    if self.highlight_names else None)
+        bi = self._bucket_index()
+
+        # grov nivå: en bubbla per hink vars ankarslot syns
+        if self._level is not None:
+            buckets = bi.buckets(self._level)
+            for idx in range(bisect_left(buckets, a, key=_anchor),
+                             bisect_right(buckets, b, key=_anchor)):
+                self._draw_bucket(self._level, idx, buckets[idx])
+            return
+
+        # events: all geometri är proportionell mot scale, så zoom kan skala den
+        sc = self.scale
+        radius = 12 * sc
+        gap_y = 8 * sc
+        for j in range(a, b + 1):
+            s0, s1 = bi.starts[j], bi.starts[j + 1]
+            if s1 - s0 > self._max_stack and axis[j] not in self._expanded_days:
+                self._draw_bucket("day", j, bi.buckets("day")[j])   # får inte plats: en bubbla
+                continue
+            x = self._axis.slot_x(j)
+            for k, i in enumerate(range(s0, s1)):
+                ev = view[i]
+                y0 = y + k * (2 * radius + gap_y)
+
+                chars = ev.get("characters") or []
+                first_char = chars[0] if chars else ""
+                loc = ev.get("location", "")
+
+                # färger
+                fill = color_for_character(first_char)
+                outline = color_for_location(loc)
+                tags = ("scene", "event", f"event_{i}", f"e{j}")
+
+                # highlight
+                is_hit = hit_keys is None or id(ev) in hit_keys
+                if not is_hit:
+                    fill = "#dddddd"; outline = "#cccccc"
+
+                c.create_oval(x - radius, y0 - radius, x + radius, y0 + radius,
+                    fill=fill, outline=outline, width=3, tags=tags)
+
+                txt_color = "#000" if is_hit else "#999"
+                c.create_text(x, y0 - radius - 2 * sc, text=ev.get("title", ""),
+                              fill=txt_color, font=("TkDefaultFont", 9), tags=tags)
+                act = ev.get("activity", "")
+                if act:
+                    c.create_text(x, y0 - radius + 12 * sc, text=act,
+                                  fill=txt_color, font=("TkDefaultFont", 8), tags=tags)
+
+                # thumbnail: event -> char -> loc; platshållare tills den avkodats
+                p = self._thumb_path(ev)
+                if p:
+                    tx = x + radius + 10 * sc
+                    th, ticket = self.images.fetch(p, (40, 40),
+                                                   lambda img, i=i, j=j: self._thumb_ready(i, j, img))
+                    if th is not None:
+                        c.create_image(tx, y0, image=th, anchor="w", tags=tags)
+                        self._slot_imgs.setdefault(j, []).append(th)
+                    elif ticket is not None:
+                        c.create_rectangle(tx, y0 - 20, tx + 40, y0 + 20, fill="#eeeeee", outline="",
+                                           tags=tags + (f"th_{i}",))
+                        self._slot_jobs.setdefault(j, []).append(ticket)
+
+                # badges för karaktärer
+                if chars:
+                    br = 5 * sc; gap = 2 * sc
+                    total = len(chars) * (2 * br) + (len(chars) - 1) * gap
+                    start = x - total / 2 + br
+                    badge_y = y0 + radius + 8 * sc
+                    for k2, nm in enumerate(chars):
+                        bx = start + k2 * (2 * br + gap)
+                        bfill = color_for_character(nm) if is_hit else "#e5e7eb"
+                        c.create_oval(bx - br, badge_y - br, bx + br, badge_y + br,
+                                      fill=bfill, outline="#222", width=1, tags=tags)
+
+    def _prefetch(self, dx: float):
+        """Beställ miniatyrer för slots strax utanför bild åt det håll vyn panoreras,
+        så att de redan är avkodade när de kommer in. Äldre förhämtningar som inte
+        längre behövs avbeställs."""
+        old, self._prefetched = self._prefetched, {}
+        for p in islice(self._prefetch_paths(dx), PREFETCH_MAX):
+            t = old.pop(p, None)
+            if t is None:
+                t = self.images.fetch(p, (40, 40), _ignore)[1]
+            if t is not None:
+                self._prefetched[p] = t
+        for t in old.values():
+            self.images.cancel(t)
+
+    def _prefetch_paths(self, dx: float):
+        if self._level is not None: return          # hinkar ritar inga miniatyrer
+        w = self.canvas.winfo_width()
+        if dx < 0:      # innehållet flyttas åt vänster: det som kommer in ligger till höger
+            a, b = self._axis.visible_slots(w + CULL_MARGIN, w + CULL_MARGIN + PREFETCH_PX)
+            slots = range(a, b + 1)
+        else:
+            a, b = self._axis.visible_slots(-CULL_MARGIN - PREFETCH_PX, -CULL_MARGIN)
+            slots = range(b, a - 1, -1)             # närmast först
+        view, bi, axis = self.events_panel.filtered_view(), self._bucket_index(), self._axis.ords
+        seen = set()
+        for j in slots:
+            s0, s1 = bi.starts[j], bi.starts[j + 1]
+            if s1 - s0 > self._max_stack and axis[j] not in self._expanded_days:
+                continue                            # ritas som en dagbubbla
+            for i in range(s0, s1):
+                p = self._thumb_path(view[i])
+                if p and p not in seen:
+                    seen.add(p)
+                    yield p
+
+    def _thumb_ready(self, i: int, j: int, img):
+        """Byt platshållaren för event i mot den avkodade miniatyren (på dess nuvarande plats)."""
+        c = self.canvas
+        ph = c.find_withtag(f"th_{i}")
+        if not ph: return
+        if img is not None:
+            x0, y0, _, y1 = c.coords(ph[0])
+            tags = tuple(t for t in c.gettags(ph[0]) if t not in (f"th_{i}", "current"))
+            item = c.create_image(x0, (y0 + y1) / 2, image=img, anchor="w", tags=tags)
+            c.tag_raise(item, ph[0])                  # samma plats i staplingen
+            self._slot_imgs.setdefault(j, []).append(img)
+        c.delete(ph[0])
+
+    # ticks: ett intervall som får plats, cachat per (vy, bredd, axeltyp); bara synliga ritas
+    def _draw_ticks(self):
+        c, y = self.canvas, self._base_y
+        c.delete("tick")
+        ax, w = self._axis, c.winfo_width()
+        axis = ax.ords
+        if not axis: return
+        if len(axis) == 1:
+            ticks, x0 = [(0.0, format_date_dmy(date.fromordinal(axis[0])))], ax.single_x
+        else:
+            key = (self._axis_version, w, ax.px_per_day)
+            if key != self._ticks_key:
+                self._ticks_key = key
+                self._ticks = (calendar_ticks(axis[0], axis[-1], ax.px_per_day) if ax.px_per_day
+                               else slot_ticks(axis, ax.step, self._bucket_index().buckets))
+            ticks, x0 = self._ticks, ax.start
+        first = bisect_left(ticks, -CULL_MARGIN - x0, key=_tick_x)
+        last = bisect_right(ticks, w + CULL_MARGIN - x0, key=_tick_x)
+        for off, label in ticks[first:last]:
+            xx = x0 + off
+            c.create_line(xx, y-8, xx, y+8, fill="#777", tags=("tick",))
+            c.create_text(xx, y-24, text=label, font=("TkDefaultFont", 9, "bold"), tags=("tick",))
+        c.tag_lower("tick")               # under events (och baslinjen, det syns inte)
+
+    # level of detail
+    def _bucket_index(self) -> BucketIndex:
+        view = self.events_panel.filtered_view()
+        if self._lod is None or self._lod.view is not view:
+            self._lod = BucketIndex(view, self._collect_unique_dates())
+        return self._lod
+
+    def _choose_lod(self):
+        """Sätt _level (None = enskilda events) och _max_stack efter scale och pixeltäthet."""
+        radius = 12 * self.scale
+        self._max_stack = max(1, int((self.canvas.winfo_height() - self._base_y - 20)
+                                     // (2 * radius + 8 * self.scale)))
+        step = self._axis.step if len(self._axis) > 1 else float("inf")
+        self._level = self._bucket_index().choose_level(step, 2 * radius + 6)
+
+    def _draw_bucket(self, level: str, idx: int, b):
+        """Bubbla med antal och karaktärernas andelar som tårtbitar; klick expanderar."""
+        c, sc = self.canvas, self.scale
+        x, y = self._axis.slot_x(b.anchor), self._base_y
+        r = 12 * sc * min(2.0, 0.9 + 0.35 * math.log10(max(1, b.count)))
+        tags = ("scene", "bucket", f"bucket_{level}_{idx}", f"e{b.anchor}")
+        shares = self._bucket_index().shares(level, idx, b)
+        total = sum(n for _nm, n in shares) or 1
+        dim = bool(self.highlight_names) and not any(nm in self.highlight_names for nm, _n in shares)
+        angle = 90.0
+        for nm, n in shares[:6]:
+            extent = min(359.9, 360.0 * n / total)
+            fill = "#dddddd" if dim else color_for_character(nm)
+            c.create_arc(x - r, y - r, x + r, y + r, start=angle, extent=-extent,
+                         fill=fill, outline="", style="pieslice", tags=tags)
+            angle -= extent
+        if len(shares) > 6:
+            c.create_arc(x - r, y - r, x + r, y + r, start=angle, extent=-(angle + 270.0),
+                         fill="#cbd5e1", outline="", style="pieslice", tags=tags)
+        ri = r * 0.55
+        c.create_oval(x - ri, y - ri, x + ri, y + ri, fill="#fff", outline="#222", tags=tags)
+        c.create_text(x, y, text=str(b.count), font=("TkDefaultFont", 8, "bold"), tags=tags)
+
+    def _on_bucket_click(self, _e):
+        cur = self.canvas.find_withtag("current")
+        if not cur: return
+        key = next((t for t in self.canvas.gettags(cur[0]) if t.startswith("bucket_")), None)
+        if not key: return
+        _, level, idx = key.split("_")
+        b = self._bucket_index().buckets(level)[int(idx)]
+        if b.lo == b.hi:
+            # en enda dag: visa hela stapeln
+            self._expanded_days.add(self._axis.ords[b.lo])
+            self.redraw()
+        else:
+            # flera datum: filtrera till hinkens datum, då räcker pixlarna till en finare nivå
+            self.events_panel.narrow_to_dates(date.fromordinal(self._axis.ords[b.lo]),
+                                              date.fromordinal(self._axis.ords[b.hi]))
+
+    # zoom: skala befintliga events runt sin axelpunkt (i nästa frame), rita inget nytt
     def on_zoom(self, event):
         zin = False
         if hasattr(event, "delta") and event.delta: zin = event.delta > 0
         elif hasattr(event, "num"):                 zin = (event.num == 4)
-        self.scale *= 1.1 if zin else 0.9
-        self.scale = max(0.6, min(self.scale, 3.0))
-        self.redraw()
+        old = self.scale
+        self.scale = max(0.6, min(old * (1.1 if zin else 0.9), 3.0))
+        if self.scale == old: return
+        # ny nivå, eller en synlig dag som byter mellan stapel och bubbla: rita om
+        level, stack = self._level, self._max_stack
+        self._choose_lod()
+        if self._level != level or self._stack_crossed(stack):
+            self.redraw()
+            return
+        self._pending_zoom *= self.scale / old
+        self.frames.request()
+
+    def _stack_crossed(self, old_stack: int) -> bool:
+        if self._level is not None or old_stack == self._max_stack: return False
+        lo, hi = sorted((old_stack, self._max_stack))
+        bi = self._bucket_index()
+        return any(lo < bi.slot_count(j) <= hi and self._axis.ords[j] not in self._expanded_days
+                   for j in range(self._drawn[0], self._drawn[1] + 1))
 
     # axis 
-    def _collect_unique_dates(self) -> list[date]:
-        ds, seen = [], set()
-        for ev in self.events_panel.filtered_data():
-            d = _parse_date_str(ev.get("date", ""))
-            if d and d not in seen:
-                seen.add(d); ds.append(d)
-        ds.sort()
-        return ds
+    def _collect_unique_dates(self) -> list[int]:
+        # vyn är datumsorterad: unika i ordning, okända ligger sist
+        view = self.events_panel.filtered_view()
+        if view.version != self._axis_version:
+            self._axis_version = view.version
+            self._expanded_days.clear()             # ny data eller nytt filter: stapla som vanligt igen
+            uniq = list(dict.fromkeys(view.ords))
+            if uniq and uniq[-1] == UNKNOWN: uniq.pop()
+            self._axis = Axis(uniq)
+        return self._axis.ords
 
     def _build_axis(self, width: int):
-        self._axis_dates = self._collect_unique_dates()
+        self._collect_unique_dates()
         usable = max(40, width - 2 * self._margin)
-        n = len(self._axis_dates)
-        if n <= 1:
-            self._axis_start_x = self._margin + self._pan
-            self._axis_step = 0.0
-            self._single_x = width / 2 + self._pan
-        else:
-            self._axis_start_x = self._margin + self._pan
-            self._axis_step = usable / (n - 1)
-            self._single_x = 0.0
-
-    def _date_to_x(self, d: date) -> float:
-        if len(self._axis_dates) == 1:
-            return self._single_x
-        if d not in self._axis_dates:
-            if not self._axis_dates: return self._axis_start_x
-            idx = min(range(len(self._axis_dates)),
-                      key=lambda i: abs((self._axis_dates[i] - d).days))
-        else:
-            idx = self._axis_dates.index(d)
-        return self._axis_start_x + idx * self._axis_step
+        self._axis.layout(self._margin + self._pan, usable, width / 2 + self._pan,
+                          self.proportional.get())
 
     def _x_to_nearest_date(self, x: float) -> date | None:
-        if not self._axis_dates: return None
-        if len(self._axis_dates) == 1: return self._axis_dates[0]
-        idx = round((x - self._axis_start_x) / (self._axis_step if self._axis_step else 1))
-        idx = max(0, min(idx, len(self._axis_dates) - 1))
-        return self._axis_dates[idx]
+        o = self._axis.x_to_ordinal(x)
+        return date.fromordinal(o) if o is not None else None
 
     # legend
     def _draw_legend(self, c: tk.Canvas):
+        """Legenden är ett eget lager: ritas bara om när karaktärer/platser (och deras
+        bilder) eller highlight ändrats. Bakgrundens storlek räknas ut med fontmått."""
+        key = (self.characters.version, self.locations.version, frozenset(self.highlight_names))
+        if key == self._legend_key: return
+        self._legend_key = key
+
         chars = [ci.get("name", "") for ci in self.get_characters() if ci.get("name", "")]
         locs  = [li.get("name", "") for li in self.get_locations() if li.get("name", "")]
 
-        if not chars and not locs:
-            c.delete("legend"); c.delete("legend_bg"); return
+        c.delete("legend"); c.delete("legend_bg")
+        self._legend_char_tags.clear()
+        self._legend_imgs = []
+        for t in self._legend_jobs: self.images.cancel(t)
+        self._legend_jobs = []
+        if not chars and not locs: return
 
         pad, x, y = 8, 12, 12
         line_h, r = 18, 6
-        c.delete("legend"); c.delete("legend_bg")
-        self._legend_char_tags.clear()
+        font, bold = self._legend_fonts
+        right = x
 
         if chars:
             c.create_text(x, y, anchor="nw", text="Characters",
-                          font=("TkDefaultFont", 9, "bold"), tags=("legend",))
+                          font=bold, tags=("legend",))
+            right = max(right, x + bold.measure("Characters"))
             y += line_h
             for idx, name in enumerate(chars):
                 tag = f"legend_char_{idx}"
                 self._legend_char_tags[tag] = name
-                th = self._get_thumb(self._char_image(name) or "", max_wh=(22,22))
+                th, ticket = self.images.fetch(self._char_image(name) or "", (22,22),
+                                               lambda img, tag=tag: self._legend_thumb_ready(tag, img))
                 if th:
                     c.create_image(x+11, y+9, image=th, tags=("legend","legend_char",tag))
-                    c._img_refs.append(th)
+                    self._legend_imgs.append(th)
                 else:
+                    # färgprick; byts mot bilden om den håller på att avkodas
                     clr = color_for_character(name)
                     c.create_oval(x, y, x+2*r, y+2*r, fill=clr, outline="#222",
-                                  tags=("legend","legend_char",tag))
+                                  tags=("legend","legend_char",tag,"legend_dot"))
+                    if ticket is not None: self._legend_jobs.append(ticket)
+                f = bold if name in self.highlight_names else font
                 c.create_text(x + 2*r + 6, y - 2, anchor="nw", text=name,
-                              font=("TkDefaultFont", 9), tags=("legend","legend_char",tag))
+                              font=f, tags=("legend","legend_char",tag))
+                right = max(right, x + 2*r + 6 + f.measure(name))
                 y += line_h
 
         if locs:
             y += 6 if chars else 0
             c.create_text(x, y, anchor="nw", text="Locations",
-                          font=("TkDefaultFont", 9, "bold"), tags=("legend",))
+                          font=bold, tags=("legend",))
+            right = max(right, x + bold.measure("Locations"))
             y += line_h
             for name in locs:
                 clr = color_for_location(name)
                 c.create_oval(x, y, x + 2*r, y + 2*r, fill="", outline=clr, width=2, tags=("legend",))
                 c.create_text(x + 2*r + 6, y - 2, anchor="nw", text=name,
-                              font=("TkDefaultFont", 9), tags=("legend",))
+                              font=font, tags=("legend",))
+                right = max(right, x + 2*r + 6 + font.measure(name))
                 y += line_h
 
-        c.update_idletasks()
-        bbox = c.bbox("legend")
-        if bbox:
-            x0, y0, x1, y1 = bbox
-            bg = c.create_rectangle(x0 - pad, y0 - pad, x1 + pad, y1 + pad,
-                                    fill="#fff", outline="#ddd", tags=("legend_bg",))
-            c.tag_lower(bg, "legend")
+        # samma ruta som bbox("legend") + pad, utan att tvinga fram en layout
+        bg = c.create_rectangle(x - pad, 12 - 2 - pad, right + pad, y - line_h + 20 + pad,
+                                fill="#fff", outline="#ddd", tags=("legend_bg",))
+        c.tag_lower(bg, "legend")
+
+    def _legend_thumb_ready(self, tag: str, img):
+        if img is None: return
+        c = self.canvas
+        dot = next((it for it in c.find_withtag(tag) if "legend_dot" in c.gettags(it)), None)
+        if dot is None: return
+        x, y = c.coords(dot)[:2]
+        item = c.create_image(x+11, y+9, image=img, tags=("legend","legend_char",tag))
+        c.tag_raise(item, dot)
+        c.delete(dot)
+        self._legend_imgs.append(img)
 
     def on_legend_char_click(self, _event):
         cur = self.canvas.find_withtag("current")
@@ -393,59 +579,78 @@ class TimelineView(ttk.Frame):
             self.highlight_names.clear()
             self.redraw()
 
-    # hover tooltip 
+    # hover tooltip: ett fönster som återanvänds, visas efter HOVER_DELAY_MS
     def _event_hover_in(self, event):
         cur = self.canvas.find_withtag("current")
         if not cur: return
         tags = self.canvas.gettags(cur[0])
         fidx = next((int(t.split("_")[1]) for t in tags if t.startswith("event_")), None)
         if fidx is None: return
-        ev = self.events_panel.filtered_data()[fidx]
-
-        chars = ev.get("characters") or []
-        loc = ev.get("location","")
-        img_path = (ev.get("image","") or "").strip()
-        if not img_path and chars:
-            img_path = self._char_image(chars[0]) or ""
-        if not img_path and loc:
-            img_path = self._loc_image(loc) or ""
-
-        if self._hover: self._hover.destroy()
-        tip = Toplevel(self)
-        tip.overrideredirect(True)
-        tip.attributes("-topmost", True)
+        self._cancel_hover()
         x = self.winfo_rootx() + event.x + 16
         y = self.winfo_rooty() + event.y + 16
-        tip.geometry(f"+{x}+{y}")
-
-        frm = ttk.Frame(tip, padding=6, relief="solid")
-        frm.pack(fill="both", expand=True)
+        version = self.events_panel.filtered_view().version
+        self._hover_job = self.after(HOVER_DELAY_MS, self._show_hover, fidx, version, x, y)
 
+    def _event_hover_out(self, _e):
+        self._cancel_hover()
+        self.images.cancel(self._tip_ticket)
+        self._tip_ticket = None
+        if self._tip is not None:
+            self._tip.withdraw()
+
+    def _cancel_hover(self):
+        if self._hover_job is not None:
+            self.after_cancel(self._hover_job)
+            self._hover_job = None
+
+    def _ensure_tip(self) -> Toplevel:
+        if self._tip is None:
+            tip = Toplevel(self)
+            tip.withdraw()
+            tip.overrideredirect(True)
+            tip.attributes("-topmost", True)
+            frm = ttk.Frame(tip, padding=6, relief="solid")
+            frm.pack(fill="both", expand=True)
+            self._tip_text = ttk.Label(frm, font=("TkDefaultFont", 9, "bold"))
+            self._tip_text.grid(row=0, column=0, sticky="w")
+            self._tip_img = ttk.Label(frm)
+            self._tip_img.grid(row=0, column=1, sticky="w", padx=(8,0))
+            self._tip = tip
+        return self._tip
+
+    def _show_hover(self, fidx: int, version: int, x: int, y: int):
+        self._hover_job = None
+        view = self.events_panel.filtered_view()
+        if view.version != version or not 0 <= fidx < len(view):
+            return                                       # vyn har ändrats sedan <Enter>
+        ev = view[fidx]
+
+        tip = self._ensure_tip()
         title = ev.get("Event",""); date_s = ev.get("date","")
         act = ev.get("activity","")
-        info = f"{title}\n{date_s}" + (f"\n{act}" if act else "")
-        ttk.Label(frm, text=info, font=("TkDefaultFont", 9, "bold")).grid(row=0, column=0, sticky="w")
-
-        lbl = ttk.Label(frm); lbl.grid(row=0, column=1, sticky="w", padx=(8,0))
-        self._hover_img = None
-        if img_path and Path(img_path).exists():
-            try:
-                if PIL_OK:
-                    im = Image.open(img_path); im.thumbnail((100,100))
-                    self._hover_img = ImageTk.PhotoImage(im)
-                else:
-                    self._hover_img = tk.PhotoImage(file=img_path)
-                lbl.configure(image=self._hover_img)
-            except Exception:
-                pass
+        self._tip_text.configure(text=f"{title}\n{date_s}" + (f"\n{act}" if act else ""))
 
-        self._hover = tip
+        # texten visas direkt, bilden när den avkodats
+        self.images.cancel(self._tip_ticket)
+        th, self._tip_ticket = self.images.fetch(self._thumb_path(ev), (100,100), self._tip_image_ready)
+        self._set_tip_image(th)
 
-    def _event_hover_out(self, _e):
-        if self._hover:
-            self._hover.destroy()
-            self._hover = None
-            self._hover_img = None
+        tip.geometry(f"+{x}+{y}")
+        tip.deiconify()
+        tip.lift()
+
+    def _tip_image_ready(self, img):
+        self._tip_ticket = None
+        self._set_tip_image(img)
+
+    def _set_tip_image(self, img):
+        if img is not None:
+            self._tip_img.configure(image=img)
+            self._tip_img.grid()
+        else:
+            self._tip_img.configure(image="")
+            self._tip_img.grid_remove()
 
     # detaljer: med char+location thumbnails
     def on_canvas_event_details(self, _event):
@@ -454,19 +659,15 @@ class TimelineView(ttk.Frame):
         tags = self.canvas.gettags(cur[0])
         fidx = next((int(t.split("_")[1]) for t in tags if t.startswith("event_")), None)
         if fidx is None: return
-        ev = self.events_panel.filtered_data()[fidx]
+        ev = self.events_panel.filtered_view()[fidx]
 
         chars = ev.get("characters", [])
         loc_name = ev.get("location", "")
         activity = ev.get("activity", "")
 
-        def _cdesc(nm):
-            for c in self.get_characters():
-                if c.get("name","")==nm: return c.get("description","")
-            return ""
-        char_lines = [nm + (f"\n— {_cdesc(nm)}" if _cdesc(nm) else "") for nm in chars]
-        lo_desc = next((l.get("description","") for l in self.get_locations()
-                        if l.get("name","")==loc_name), "")
+        cdesc = {nm: self.characters.description(nm) for nm in chars}
+        char_lines = [nm + (f"\n— {cdesc[nm]}" if cdesc[nm] else "") for nm in chars]
+        lo_desc = self.locations.description(loc_name)
         text = (f"Event: {ev.get('Event','')}\n"
                 f"Date: {ev.get('date','')}\n\n"
                 f"Characters:\n" + ("\n\n".join(char_lines) if char_lines else "(none)") + "\n\n")
@@ -505,33 +706,55 @@ class TimelineView(ttk.Frame):
         lbl_main = ttk.Label(right); lbl_main.pack(anchor="n")
 
         strip = ttk.Frame(frm); strip.grid(row=1, column=1, sticky="ew", pady=(8,0))
-        win._imgs = []  # referenser
+        win._imgs = []     # referenser
+        win._main = ""     # senast valda huvudbild (äldre avkodningar ignoreras)
+        tickets = []       # avbeställs när fönstret stängs
 
-        def set_main(path: str):
-            img = self._make_img(path, max_wh=(520,520))
+        def on_destroy(e):
+            if e.widget is win:
+                for t in tickets: self.images.cancel(t)
+        win.bind("<Destroy>", on_destroy)
+
+        def show_main(path: str, img):
+            if path != win._main: return
             if img:
                 lbl_main.configure(image=img, text="")
                 win._imgs.append(img)
             else:
-                lbl_main.configure(text=f"(Could not load image)\n{path}")
+                lbl_main.configure(image="", text=f"(Could not load image)\n{path}")
+
+        def set_main(path: str):
+            win._main = path
+            img, t = self.images.fetch(path, (520,520), lambda img: show_main(path, img))
+            if t is None:
+                show_main(path, img)
+            else:
+                lbl_main.configure(image="", text="Loading…")
+                tickets.append(t)
+
+        def set_thumb(b: ttk.Label, img):
+            if img:
+                b.configure(image=img)
+                win._imgs.append(img)
 
         # initial huvudbild
         done = False
         for p in main_candidates:
-            if p and Path(p).exists():
+            if self.images.exists(p):
                 set_main(p); done = True; break
         if not done:
             lbl_main.configure(text="(No image)")
 
         # thumbnails klickbara
         for lab, p in thumbs:
-            th = self._get_thumb(p, max_wh=(80,80))
-            if not th: continue
-            b = ttk.Label(strip, image=th, cursor="hand2")
+            if not self.images.exists(p): continue
+            b = ttk.Label(strip, cursor="hand2")
             b.pack(side="left", padx=4)
             b.bind("<Button-1>", lambda e, path=p: set_main(path))
-            win._imgs.append(th)
             ttk.Label(strip, text=lab).pack(side="left", padx=(0,8))
+            th, t = self.images.fetch(p, (80,80), lambda img, b=b: set_thumb(b, img))
+            if t is None: set_thumb(b, th)
+            else: tickets.append(t)
 
     #  pan 
     def _pan_start(self, e):
@@ -543,7 +766,8 @@ class TimelineView(ttk.Frame):
         dx = e.x - self._pan_last_x
         self._pan_last_x = e.x
         self._pan += dx
-        self.redraw()
+        self._pending_dx += dx
+        self.frames.request()
 
     def _pan_end(self, _e):
         self._pan_dragging = False
@@ -570,19 +794,10 @@ class TimelineView(ttk.Frame):
         if self._drag_ev_index is None: return
         near_date = self._x_to_nearest_date(event.x)
         if near_date:
-            if hasattr(self.events_panel, "set_event_date_by_filtered_index"):
-                self.events_panel.set_event_date_by_filtered_index(
-                    self._drag_ev_index, _format_date_dmy(near_date)
-                )
-            else:
-                ev = self.events_panel.filtered_data()[self._drag_ev_index]
-                target_date = _format_date_dmy(near_date)
-                idx = None
-                for k, orig in enumerate(self.events_panel.data()):
-                    if orig is ev: idx = k; break
-                if idx is not None:
-                    self.events_panel.data()[idx]["date"] = target_date
-                    self.events_panel.refresh()
+            # panelen ersätter eventet (EventStore, index och on_record håller takten)
+            self.events_panel.set_event_date_by_filtered_index(
+                self._drag_ev_index, format_date_dmy(near_date)
+            )
         self._drag_ev_index = None
         if self._drag_marker:
             self.canvas.delete(self._drag_marker); self._drag_marker = None
@@ -0,0 +1,136 @@
+# ui/virtual_list.py
+import tkinter as tk
+from tkinter import ttk
+from tkinter import font as tkfont
+
+
+class VirtualList(ttk.Frame):
+    """
+    Listbox som bara formaterar och lägger in de rader som syns.
+    Datan beskrivs av antal rader + label_fn(i) (och ev. color_fn(i));
+    urval och index är alltid i hela listans koordinater, inte Tk-radens.
+    Har samma urvalsmetoder som tk.Listbox som panelerna använder
+    (curselection, selection_set, selection_clear, see).
+    """
+    def __init__(self, master, height: int = 10, on_select=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self._count = 0
+        self._label_fn = lambda i: ""
+        self._color_fn = None
+        self._top = 0
+        self._rows = height
+        self._selected: int | None = None
+
+        self.listbox = tk.Listbox(self, height=height, exportselection=False, activestyle="none")
+        self.vbar = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.vbar.pack(side="right", fill="y")
+
+        self._line_h = max(1, tkfont.nametofont(self.listbox.cget("font")).metrics("linespace") + 1)
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_click)
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", self._on_wheel)   # linux
+        self.listbox.bind("<Button-5>", self._on_wheel)   # linux
+        self.listbox.bind("<Up>", lambda e: self._step(-1))
+        self.listbox.bind("<Down>", lambda e: self._step(1))
+        self.listbox.bind("<Prior>", lambda e: self._step(-self._rows))
+        self.listbox.bind("<Next>", lambda e: self._step(self._rows))
+
+    #  data
+    def set_rows(self, count: int, label_fn, color_fn=None):
+        """Byt innehåll: count rader, label_fn(i) -> text, color_fn(i) -> färg. Rensar urvalet."""
+        self._count = count
+        self._label_fn = label_fn
+        self._color_fn = color_fn
+        self._selected = None
+        self._top = max(0, min(self._top, count - self._rows))
+        self._render()
+
+    def size(self) -> int:
+        return self._count
+
+    #  urval (Listbox-kompatibelt)
+    def curselection(self) -> tuple:
+        return (self._selected,) if self._selected is not None else ()
+
+    def selection_clear(self, *_):
+        self._selected = None
+        self.listbox.selection_clear(0, tk.END)
+
+    def selection_set(self, i: int):
+        if 0 <= i < self._count:
+            self._selected = i
+            self._render()
+
+    def see(self, i: int):
+        if i < self._top:
+            self._top = i
+        elif i >= self._top + self._rows:
+            self._top = i - self._rows + 1
+        self._render()
+
+    #  rendering
+    def _render(self):
+        lb = self.listbox
+        lb.delete(0, tk.END)
+        end = min(self._count, self._top + self._rows + 1)   # +1: delvis synlig sista rad
+        for i in range(self._top, end):
+            lb.insert(tk.END, self._label_fn(i))
+            if self._color_fn:
+                try:
+                    clr = self._color_fn(i)
+                    if clr: lb.itemconfig(i - self._top, foreground=clr)
+                except Exception:
+                    pass
+        if self._selected is not None and self._top <= self._selected < end:
+            lb.selection_set(self._selected - self._top)
+        if self._count:
+            self.vbar.set(self._top / self._count, min(1.0, (self._top + self._rows) / self._count))
+        else:
+            self.vbar.set(0.0, 1.0)
+
+    def _scroll_to(self, top: int):
+        top = max(0, min(int(top), self._count - self._rows))
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _yview(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * self._count)
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self._scroll_to(self._top + (n * self._rows if args[2] == "pages" else n))
+
+    #  händelser
+    def _on_resize(self, e):
+        rows = max(1, e.height // self._line_h)
+        if rows != self._rows:
+            self._rows = rows
+            self._top = max(0, min(self._top, self._count - rows))
+            self._render()
+
+    def _on_wheel(self, e):
+        if getattr(e, "num", None) == 4:   step = -3
+        elif getattr(e, "num", None) == 5: step = 3
+        else:                              step = -3 if e.delta > 0 else 3
+        self._scroll_to(self._top + step)
+        return "break"
+
+    def _on_click(self, _e=None):
+        sel = self.listbox.curselection()
+        if not sel: return
+        self._selected = self._top + sel[0]
+        if self.on_select: self.on_select()
+
+    def _step(self, delta: int):
+        if not self._count: return "break"
+        cur = self._selected if self._selected is not None else self._top - (1 if delta > 0 else 0)
+        i = max(0, min(cur + delta, self._count - 1))
+        self._selected = i
+        self.see(i)
+        if self.on_select: self.on_select()
+        return "break"